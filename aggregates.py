@@ -0,0 +1,117 @@
+import json
+from collections import Counter
+
+import pandas as pd
+
+from rotations import split_rotations
+from schema import EPA_COMPLETED_COLS
+
+
+# ---------------------------
+# Dashboard aggregates
+# ---------------------------
+# Running totals behind "2. Rotations, EPA Tracking Dashboard". The storage
+# layer applies each write's removed/added rows to them, so rendering the
+# dashboard costs O(#distinct years/rotations/institutions), not O(roster).
+
+def _key(value):
+    # Store numpy scalars as plain Python values so they round-trip via JSON
+    return value.item() if hasattr(value, "item") else value
+
+
+class DashboardAggregates:
+    def __init__(self):
+        self.total = 0
+        self.years = Counter()
+        self.rotations = Counter()
+        self.institutions = Counter()
+        self.epa_completed = Counter()
+        self.teaching_sum = 0.0
+        self.teaching_count = 0
+        self.source_key = None
+
+    @classmethod
+    def from_roster(cls, df: pd.DataFrame) -> "DashboardAggregates":
+        agg = cls()
+        agg.apply(None, df)
+        return agg
+
+    def apply(self, removed, added):
+        """Subtract `removed` rows and add `added` rows (DataFrames or None)."""
+        for rows, sign in ((removed, -1), (added, 1)):
+            if rows is None or rows.empty:
+                continue
+            self.total += sign * len(rows)
+            if "year" in rows:
+                self._count(self.years, rows["year"].dropna(), sign)
+            if "sponsoring_institution" in rows:
+                self._count(self.institutions, rows["sponsoring_institution"].dropna(), sign)
+            if "rotations" in rows:
+                self._count(self.rotations, split_rotations(rows["rotations"]), sign)
+            for col in EPA_COMPLETED_COLS:
+                if col in rows:
+                    self.epa_completed[col] += sign * int((rows[col] == "Yes").sum())
+            if "teaching_hours" in rows:
+                hours = pd.to_numeric(rows["teaching_hours"], errors="coerce").dropna()
+                self.teaching_sum += sign * float(hours.sum())
+                self.teaching_count += sign * len(hours)
+
+    def merge(self, other: "DashboardAggregates"):
+        """Add another set of totals, e.g. those of a batch of new rows."""
+        self.total += other.total
+        for mine, theirs in ((self.years, other.years), (self.rotations, other.rotations),
+                             (self.institutions, other.institutions), (self.epa_completed, other.epa_completed)):
+            mine.update(theirs)
+        self.teaching_sum += other.teaching_sum
+        self.teaching_count += other.teaching_count
+
+    @staticmethod
+    def _count(counter: Counter, values, sign: int):
+        for value, n in pd.Series(values).value_counts().items():
+            value = _key(value)
+            counter[value] += sign * int(n)
+            if counter[value] <= 0:
+                del counter[value]
+
+    # Series in the shapes the dashboard previously built with value_counts()
+    def year_counts(self) -> pd.Series:
+        return pd.Series(dict(self.years), dtype="int64").sort_index()
+
+    def rotation_counts(self) -> pd.Series:
+        return pd.Series(dict(self.rotations.most_common()), dtype="int64")
+
+    def institution_counts(self) -> pd.Series:
+        return pd.Series(dict(self.institutions.most_common()), dtype="int64")
+
+    def epa_completed_counts(self) -> pd.Series:
+        return pd.Series([self.epa_completed[c] for c in EPA_COMPLETED_COLS], index=EPA_COMPLETED_COLS)
+
+    @property
+    def teaching_average(self) -> float:
+        return self.teaching_sum / self.teaching_count if self.teaching_count else float("nan")
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "total": self.total,
+            "years": list(self.years.items()),
+            "rotations": list(self.rotations.items()),
+            "institutions": list(self.institutions.items()),
+            "epa_completed": dict(self.epa_completed),
+            "teaching_sum": self.teaching_sum,
+            "teaching_count": self.teaching_count,
+            "source_key": self.source_key,
+        })
+
+    @classmethod
+    def from_json(cls, text: str) -> "DashboardAggregates":
+        data = json.loads(text)
+        agg = cls()
+        agg.total = data["total"]
+        agg.years = Counter(dict(data["years"]))
+        agg.rotations = Counter(dict(data["rotations"]))
+        agg.institutions = Counter(dict(data["institutions"]))
+        agg.epa_completed = Counter(data["epa_completed"])
+        agg.teaching_sum = data["teaching_sum"]
+        agg.teaching_count = data["teaching_count"]
+        agg.source_key = data.get("source_key")
+        return agg
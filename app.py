@@ -1,41 +1,29 @@
+import os
+import time
+_script_start = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 from datetime import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from PIL import Image
-
-# ---------------------------
-# CSV file storage
-# ---------------------------
 
-CSV_FILE = "default.csv"
-
-# Load doctors CSV
-def load_doctors() -> pd.DataFrame:
-    try:
-        df = pd.read_csv(CSV_FILE)
-        return df
-    except FileNotFoundError:
-        cols = ["full_name","age","gender","nationality","medical_school","registration_id",
-                "email","phone","year","rotations","teaching_hours","created_at","sponsoring_institution",
-                "EPA1_Completed","EPA1_Level","EPA1_ExitMet",
-                "EPA2_Completed","EPA2_Level","EPA2_ExitMet",
-                "EPA3_Completed","EPA3_Level","EPA3_ExitMet",
-                "EPA4_Completed","EPA4_Level","EPA4_ExitMet",
-                "EPA5_Completed","EPA5_Level","EPA5_ExitMet",
-                "EPA6_Completed","EPA6_Level","EPA6_ExitMet",
-                "EPA7_Completed","EPA7_Level","EPA7_ExitMet",
-                "EPA8_Completed","EPA8_Level","EPA8_ExitMet",
-                "EPA1","EPA2","EPA3","EPA4","EPA5","EPA6","EPA7","EPA8"]
-        return pd.DataFrame(columns=cols)
-
-# Save doctors CSV
-def save_doctors(df: pd.DataFrame):
-    df.to_csv(CSV_FILE, index=False)
+from perf import (begin_trace, end_trace, instrumentation_enabled, lazy_import, phase, phase_summary,
+                  record_import, record_render, set_instrumentation, startup_report, startup_report_json, traces_jsonl)
+from storage import (load_doctors, append_doctor, update_doctor, get_doctor, cache_stats,
+                     dashboard_aggregates, rotations_table, typed_doctors, roster_index, roster_memory_report,
+                     ConflictError)
+from rotations import join_rotations, residents_in_rotation, rotation_by_institution
+from schema import (ENTRUSTMENT_LEVELS, EPA_IDS, EPA_TARGETS, SPONSORING_INSTITUTIONS, STATUS_COLS, STATUS_VALUES,
+                    level_codes)
+from roster_view import COLUMN_GROUPS, PAGE_SIZES, filter_mask, page_count, project_columns, roster_page
+from portfolio import (assessments_table, epa_milestones, highlight_not_completed, highlight_status,
+                       procedure_progress, teaching_progress)
+from readiness import below_target, epa_attainment, readiness_matrix, readiness_summary
+
+# Only the first run in a process pays for these imports; later reruns
+# find them in sys.modules. Heavier modules (plotly, smtplib/email, the
+# bulk importer) are loaded with lazy_import() in the sections using them.
+record_import("app core", time.perf_counter() - _script_start)
 
 # ---------------------------
 # Streamlit App UI
@@ -44,13 +32,13 @@ import base64
 
 st.set_page_config(page_title="Medical Education App", layout="wide")
 
-# Load image and convert to base64
-with open("med.jpg", "rb") as f:
-    data = f.read()
-    encoded = base64.b64encode(data).decode()
-
-# CSS to set sidebar background
-sidebar_bg = f"""
+# CSS to set sidebar background; the image is read and base64-encoded once
+# per server process rather than on every rerun
+@st.cache_resource
+def sidebar_background_css(path: str = "med.jpg") -> str:
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return f"""
 <style>
 [data-testid="stSidebar"] {{
     background-image: url("data:image/jpeg;base64,{encoded}");
@@ -61,7 +49,7 @@ sidebar_bg = f"""
 </style>
 """
 
-st.markdown(sidebar_bg, unsafe_allow_html=True)
+st.markdown(sidebar_background_css(), unsafe_allow_html=True)
 
 
 st.title("Medical Education — Residency Training Management App")
@@ -71,10 +59,17 @@ menu = st.sidebar.radio("Sections", [
     "2. Rotations, EPA Tracking Dashboard",
     "3. Automated Email Reminders",
     "3. Update EPA",
-    "4. Resident Portfolio"
+    "4. Resident Portfolio",
+    "5. EPA Readiness"
 ])
 
-df = load_doctors()
+begin_trace(menu)
+with phase("load") as span:
+    df = load_doctors()
+    span.rows = len(df)
+
+_stats = cache_stats()
+st.sidebar.caption(f"Roster cache — hits: {_stats['hits']}, misses: {_stats['misses']}")
 
 # ---------------------------
 # Section 1: Add Doctor
@@ -100,7 +95,7 @@ if menu == "1. Add Doctor":
             st.caption("Add rotations for the year below")
             rotations_raw = st.text_area("Rotations (semicolon separated)", value="")
             teaching_hours = st.number_input("Teaching hours (initial)", min_value=0.0, value=0.0)
-            sponsoring_institution = st.selectbox("Sponsoring Institution", ["SingHealth","NHG","NUHS"])
+            sponsoring_institution = st.selectbox("Sponsoring Institution", SPONSORING_INSTITUTIONS)
 
         st.subheader("Ultrasound / Clinical / Teaching / Exam Status")
         col1, col2, col3 = st.columns(3)
@@ -156,8 +151,18 @@ if menu == "1. Add Doctor":
 
         submit = st.form_submit_button("Save Doctor Information")
 
+    # registration_id keys every lookup, so it must be present and unique
+    # (the same rule bulk_import applies)
+    if submit:
+        registration_id = registration_id.strip()
+        if not registration_id:
+            st.error("Medical registration ID is required.")
+            submit = False
+        elif get_doctor(registration_id) is not None:
+            st.error(f"A doctor with registration ID {registration_id} already exists.")
+            submit = False
+
     if submit:
-        rotations = [r.strip() for r in rotations_raw.split(";") if r.strip()]
         new_row = {
             "full_name": full_name,
             "age": int(age),
@@ -168,7 +173,7 @@ if menu == "1. Add Doctor":
             "email": email,
             "phone": str(phone).replace(',', ''),
             "year": int(year),
-            "rotations": ";".join(rotations),
+            "rotations": join_rotations(rotations_raw),
             "teaching_hours": float(teaching_hours),
             "created_at": datetime.utcnow().isoformat(),
             "sponsoring_institution": sponsoring_institution,
@@ -199,15 +204,61 @@ if menu == "1. Add Doctor":
             "EPA7_Completed": EPA7_Completed, "EPA8_Completed": EPA8_Completed
         }
 
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        save_doctors(df)
+        with phase("save", rows=1):
+            append_doctor(new_row)
+        df = load_doctors()
         st.success(f"Saved doctor: {full_name}")
 
+    st.markdown("---")
+    st.subheader("Bulk import residents")
+    with st.expander("Import a cohort from CSV / Excel"):
+        st.caption("Columns follow default.csv. Rows are checked against the same rules as the form above; "
+                   "valid rows are saved together and the rest can be downloaded as a rejects report.")
+        upload = st.file_uploader("Roster file", type=["csv", "xlsx"])
+        if upload is not None and st.button("Import residents"):
+            with phase("save", "bulk import") as span:
+                result = lazy_import("bulk_import").import_roster(upload, upload.name)
+                span.rows = result.imported
+            df = load_doctors()
+            if result.imported == 0 and result.rejected == 0:
+                st.warning(f"{upload.name} has no rows to import.")
+            else:
+                st.success(f"Imported {result.imported} residents.")
+            if result.rejected:
+                st.warning(f"{result.rejected} rows were rejected.")
+                st.download_button("Download rejects report", result.rejects_csv,
+                                   file_name=f"rejects_{upload.name.rsplit('.', 1)[0]}.csv", mime="text/csv")
+
     st.markdown("---")
     st.subheader("All doctors in system")
-    pd.set_option('display.max_colwidth', None)
-    df['phone'] = df['phone'].astype(str).str.replace(',', '')
-    st.dataframe(df, width=2500, height=500)
+    typed = typed_doctors(df)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        name_query = st.text_input("Search by name")
+    with col2:
+        inst_filter = st.multiselect("Institution", sorted(typed['sponsoring_institution'].dropna().unique()))
+    with col3:
+        year_filter = st.multiselect("Year", [1,2,3,4,5])
+    with col4:
+        status_col = st.selectbox("Assessment status", ["Any"] + STATUS_COLS)
+        status_filter = st.multiselect("Status", STATUS_VALUES) if status_col != "Any" else []
+
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        groups = st.multiselect("Columns", list(COLUMN_GROUPS), default=["Basic", "Rotations & Teaching"])
+    with phase("compute", "filter", rows=len(typed)):
+        mask = filter_mask(typed, name_query, inst_filter, year_filter,
+                           None if status_col == "Any" else status_col, status_filter)
+    with col2:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES)
+    with col3:
+        pages = page_count(int(mask.sum()), page_size)
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+
+    st.caption(f"{int(mask.sum())} of {len(df)} doctors match")
+    grid = roster_page(df, mask, int(page), page_size, project_columns(groups))
+    with phase("render", "roster grid", rows=len(grid)) as span:
+        st.dataframe(span.payload(grid), width=2500)
 
 
 
@@ -219,37 +270,68 @@ elif menu == "2. Rotations, EPA Tracking Dashboard":
     if df.empty:
         st.info("No doctors yet — add doctors in Section 1.")
     else:
+        px = lazy_import("plotly.express")
+        with phase("compute", "aggregates") as span:
+            agg = dashboard_aggregates()
+            span.rows = agg.total
+
         # Resident counts by year
         st.subheader("Resident counts by year")
-        counts = df['year'].value_counts().sort_index()
-        st.bar_chart(counts)
+        counts = agg.year_counts()
+        with phase("render", "year counts", rows=len(counts)) as span:
+            st.bar_chart(span.payload(counts))
 
         # Top rotations by department (Top 8)
         st.subheader("Top rotations by department (Top 8)")
-        all_rots = df['rotations'].dropna().apply(lambda x: str(x).split(';'))
-        exploded = pd.Series([item for sub in all_rots for item in sub if item!=''])
-        if not exploded.empty:
-            top_rot = exploded.value_counts().head(8).reset_index()
+        rotation_counts = agg.rotation_counts()
+        if not rotation_counts.empty:
+            top_rot = rotation_counts.head(8).reset_index()
             top_rot.columns = ['Rotation','Count']
-            fig_rot = px.bar(top_rot, x='Rotation', y='Count', color='Rotation', 
-                             title="Top 8 Rotations by Department", color_discrete_sequence=px.colors.qualitative.Vivid)
-            st.plotly_chart(fig_rot, use_container_width=True)
+            with phase("chart", "top rotations", rows=len(top_rot)):
+                fig_rot = px.bar(top_rot, x='Rotation', y='Count', color='Rotation', 
+                                 title="Top 8 Rotations by Department", color_discrete_sequence=px.colors.qualitative.Vivid)
+            with phase("render", "top rotations") as span:
+                st.plotly_chart(span.payload(fig_rot), use_container_width=True)
 
         # Rotations by Sponsoring Institution
         st.subheader("Rotations by Sponsoring Institution")
-        inst_counts = df['sponsoring_institution'].value_counts().reset_index()
+        inst_counts = agg.institution_counts().reset_index()
         inst_counts.columns = ['Institution','Count']
-        fig_inst = px.bar(inst_counts, x='Institution', y='Count', color='Institution', 
-                          title="Doctor Rotations at Sponsoring Institution", color_discrete_sequence=px.colors.qualitative.Set2)
-        st.plotly_chart(fig_inst, use_container_width=True)
+        with phase("chart", "institutions", rows=len(inst_counts)):
+            fig_inst = px.bar(inst_counts, x='Institution', y='Count', color='Institution', 
+                              title="Doctor Rotations at Sponsoring Institution", color_discrete_sequence=px.colors.qualitative.Set2)
+        with phase("render", "institutions") as span:
+            st.plotly_chart(span.payload(fig_inst), use_container_width=True)
+
+        # Rotations by department and institution
+        with phase("compute", "rotations table") as span:
+            rot_table = rotations_table()
+            span.rows = len(rot_table)
+        if not rot_table.empty:
+            st.subheader("Rotations by Department and Institution")
+            with phase("compute", "rotation crosstab"):
+                cross = rotation_by_institution(rot_table).reset_index().melt(
+                    id_vars='rotation', var_name='Institution', value_name='Count')
+                cross = cross.rename(columns={'rotation': 'Rotation'})
+            with phase("chart", "rotation crosstab", rows=len(cross)):
+                fig_cross = px.bar(cross[cross['Count'] > 0], x='Rotation', y='Count', color='Institution',
+                                   title="Rotations by Department and Sponsoring Institution",
+                                   color_discrete_sequence=px.colors.qualitative.Set2)
+            with phase("render", "rotation crosstab") as span:
+                st.plotly_chart(span.payload(fig_cross), use_container_width=True)
+
+            department = st.selectbox("Residents rotating through", sorted(rot_table['rotation'].cat.categories))
+            with phase("compute", "residents in rotation"):
+                in_rotation = df[df['registration_id'].isin(residents_in_rotation(rot_table, department))]
+            with phase("render", "residents in rotation", rows=len(in_rotation)) as span:
+                st.dataframe(span.payload(in_rotation[['full_name','year','sponsoring_institution','rotations']]))
 
         # ---------------------------
         # EPA completion chart (no hover)
         # ---------------------------
         st.subheader("EPA Completion Status")
-        epa_cols = [f"EPA{i}_Completed" for i in range(1,9)]
-        epa_completed = df[epa_cols].apply(lambda x: x=="Yes").sum()
-        epa_total = len(df)
+        epa_completed = agg.epa_completed_counts()
+        epa_total = agg.total
 
         epa_df = pd.DataFrame({
             "EPA": [f"EPA{i}" for i in range(1,9)]*2,
@@ -257,17 +339,42 @@ elif menu == "2. Rotations, EPA Tracking Dashboard":
             "Count": list(epa_completed) + list(epa_total - epa_completed)
         })
 
-        fig_epa = px.bar(
-            epa_df,
-            x="EPA",
-            y="Count",
-            color="Status",
-            barmode="group",
-            color_discrete_map={"Completed / Pass":"green","Not Completed / Fail":"red"},
-            title="EPA Completion by Residents"
-        )
-
-        st.plotly_chart(fig_epa, use_container_width=True)
+        with phase("chart", "epa completion", rows=len(epa_df)):
+            fig_epa = px.bar(
+                epa_df,
+                x="EPA",
+                y="Count",
+                color="Status",
+                barmode="group",
+                color_discrete_map={"Completed / Pass":"green","Not Completed / Fail":"red"},
+                title="EPA Completion by Residents"
+            )
+
+        with phase("render", "epa completion") as span:
+            st.plotly_chart(span.payload(fig_epa), use_container_width=True)
+
+        # Logged procedures per month, read from the logbook's monthly rollup
+        logbook_mod = lazy_import("logbook")
+        with phase("compute", "logbook trend") as span:
+            trend = logbook_mod.get_logbook().monthly_trend()
+            span.rows = len(trend)
+        if not trend.empty:
+            st.subheader("Logbook entries by month")
+            trend_kinds = st.multiselect("Procedure or teaching", list(logbook_mod.KINDS),
+                                         format_func=lambda k: logbook_mod.KINDS[k][0])
+            if trend_kinds:
+                trend = trend[trend['kind'].isin(trend_kinds)]
+            with phase("chart", "logbook trend", rows=len(trend)):
+                fig_trend = px.line(trend, x='month', y='quantity', color='label', markers=True,
+                                    labels={'month': 'Month', 'quantity': 'Count / hours', 'label': 'Type'},
+                                    title="Logged Procedures and Teaching Hours by Month")
+            with phase("render", "logbook trend") as span:
+                st.plotly_chart(span.payload(fig_trend), use_container_width=True)
+
+        with st.expander("Roster memory usage"):
+            report = roster_memory_report(df)
+            st.write(f"{report['rows']} residents: {report['raw_bytes'] / 1024:.1f} KiB as loaded, "
+                     f"{report['typed_bytes'] / 1024:.1f} KiB typed ({report['reduction']:.0%} smaller)")
 
 
 # ---------------------------
@@ -276,14 +383,27 @@ elif menu == "2. Rotations, EPA Tracking Dashboard":
 elif menu == "3. Automated Email Reminders":
     st.success("This section highlights doctors whose teaching hours are below average (across all residents).")
     st.header("Doctors with Insufficient Teaching Hours")
-    st.info(f"Average teaching hours: {df['teaching_hours'].mean():.1f}")
+    # Teaching hours include sessions logged in the logbook, as on the portfolio
+    logbook_mod = lazy_import("logbook")
+    with phase("compute", "below average", rows=len(df)):
+        logged = logbook_mod.get_logbook().totals_frame()
+        if "teaching_hours" in logged:
+            roster = logbook_mod.add_logged(df, logged[["teaching_hours"]])
+            hours = pd.to_numeric(roster['teaching_hours'], errors="coerce")
+            avg_hours = hours.mean()
+            below = roster[(hours < avg_hours).to_numpy()]
+        else:
+            avg_hours = dashboard_aggregates().teaching_average
+            below = df[(typed_doctors(df)['teaching_hours'] < avg_hours).to_numpy()]
+    st.info(f"Average teaching hours: {avg_hours:.1f}")
     if df.empty:
 
         st.info("No doctors yet.")
     else:
-        avg_hours = df['teaching_hours'].mean()
-        below = df[df['teaching_hours'] < avg_hours]
-        st.dataframe(below[['full_name','email','teaching_hours','sponsoring_institution']])
+        mailer = lazy_import("mailer")
+        outbox_mod = lazy_import("outbox")
+        with phase("render", "below average", rows=len(below)) as span:
+            st.dataframe(span.payload(below[['full_name','email','teaching_hours','sponsoring_institution']]))
         st.header("Automated reminder emails to clock in additional tutoring hours")
         st.markdown("⚠️ **Note:** Configure a real email and password to send emails via SMTP.")
         sender_email = st.text_input("Sender email", value="jayelleteo@gmail.com")
@@ -305,26 +425,57 @@ Group Education Administration
 """, height = 280
         )
 
+        with st.expander("SMTP settings"):
+            smtp_host = st.text_input("SMTP host", value=mailer.SMTP_HOST)
+            smtp_port = st.number_input("SMTP port", min_value=1, max_value=65535, value=mailer.SMTP_PORT)
+            smtp_tls = st.checkbox("Use STARTTLS", value=True)
+            smtp_workers = st.number_input("Parallel connections", min_value=1, max_value=16, value=4)
+            smtp_rate = st.number_input("Max emails per second (0 = unlimited)", min_value=0.0, value=5.0)
+
+        campaign = st.text_input("Campaign", value=f"teaching-hours-{datetime.utcnow():%Y-%m}",
+                                 help="Each resident receives at most one email per campaign.")
+        outbox = outbox_mod.Outbox()
+
+        messages = None
         if st.button("Send Emails") and sender_email and sender_password:
-            for _, row in below.iterrows():
-                try:
-                    receiver_email = row['email']
-                    message = MIMEMultipart()
-                    message["From"] = sender_email
-                    message["To"] = receiver_email
-                    message["Subject"] = "Teaching Hours Reminder"
-                    body = custom_msg.format(full_name=row['full_name'], teaching_hours=row['teaching_hours'], avg_hours=avg_hours)
-                    message.attach(MIMEText(body, "plain"))
-
-                    # SMTP setup
-                    server = smtplib.SMTP("smtp.gmail.com", 587)
-                    server.starttls()
-                    server.login(sender_email, sender_password)
-                    server.sendmail(sender_email, receiver_email, message.as_string())
-                    server.quit()
-                    st.success(f"Email sent to {row['full_name']}")
-                except Exception as e:
-                    st.error(f"Failed to send email to {row['full_name']}: {e}")
+            # A typo in the custom message stops the send with an error rather
+            # than crashing the page
+            try:
+                messages = outbox_mod.render_reminders(below, sender_email, "Teaching Hours Reminder", custom_msg, avg_hours=avg_hours)
+            except KeyError as e:
+                st.error(f"Unknown placeholder {{{e.args[0]}}} in the email message. Use {{full_name}}, "
+                         "{teaching_hours} or {avg_hours}, and write a literal brace as {{ or }}.")
+            except (IndexError, ValueError) as e:
+                st.error(f"The email message has an invalid placeholder ({e}). Use {{full_name}}, "
+                         "{teaching_hours} or {avg_hours}, and write a literal brace as {{ or }}.")
+        if messages is not None:
+            with phase("save", "enqueue reminders", rows=len(below)) as span:
+                result = outbox.enqueue(messages, campaign)
+                span.bytes = sum(len(m["body"]) for m in messages)
+            outbox_mod.ensure_worker(outbox, sender_email, username=sender_email, password=sender_password, host=smtp_host,
+                          port=int(smtp_port), use_tls=smtp_tls, workers=int(smtp_workers), rate_per_sec=smtp_rate)
+            st.success(f"Queued {result.queued} reminder(s); {result.duplicates} already in campaign '{campaign}'.")
+            if result.invalid:
+                st.warning(f"{len(result.invalid)} resident(s) were not queued because their registration ID "
+                           "or email is missing: " + ", ".join(str(m.get("full_name")) for m in result.invalid))
+
+        st.subheader("Outbox")
+        counts = outbox.status_counts(campaign)
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Pending", counts["pending"])
+        col2.metric("Sending", counts["sending"])
+        col3.metric("Sent", counts["sent"])
+        col4.metric("Failed", counts["failed"])
+        col1, col2 = st.columns(2)
+        col1.button("Refresh status")
+        if col2.button("Retry failed") and counts["failed"]:
+            outbox.retry_failed(campaign)
+            if sender_email and sender_password:
+                outbox_mod.ensure_worker(outbox, sender_email, username=sender_email, password=sender_password, host=smtp_host,
+                              port=int(smtp_port), use_tls=smtp_tls, workers=int(smtp_workers), rate_per_sec=smtp_rate)
+        failures = outbox.failures(campaign)
+        if failures:
+            st.dataframe(pd.DataFrame(failures, columns=["Name", "Email", "Attempts", "Last error"]))
 
 # ---------------------------
 # Section 3 (Duplicate number): Update EPA
@@ -334,10 +485,13 @@ elif menu == "3. Update EPA":
     if df.empty:
         st.info("No doctors yet — add doctors in Section 1.")
     else:
-        resident = st.selectbox("Select resident", df['full_name'].tolist())
-        res_row = df[df['full_name']==resident].iloc[0]
+        index = roster_index()
+        resident_id = st.selectbox("Select resident", index.ids, format_func=index.label)
+        # Indexed single-row read; SQLite looks it up by registration_id
+        res_row = get_doctor(resident_id)
+        resident = res_row['full_name']
 
-        entrustment_levels = ["1","2","2a","2b","3","3a","3b","3c","4","4a","4b","5"]
+        entrustment_levels = ENTRUSTMENT_LEVELS
         epas = {
             "EPA 1: Resuscitating and Care of Critically Ill Adult Medical/Surgical Patients":"EPA1",
             "EPA 2: Resuscitating and Care of Critically Ill Adult Trauma Patients":"EPA2",
@@ -349,17 +503,33 @@ elif menu == "3. Update EPA":
             "EPA 8: Managing Patients in Extended Observation Facility (Optional)":"EPA8"
         }
 
+        # The selectboxes are keyed by resident and stored level, so they start
+        # over from the database whenever either changes. The row_version read
+        # with those levels is what a save is checked against, to detect edits
+        # made by someone else in the meantime
+        current_codes = {col: max(int(level_codes(pd.Series([res_row[col] if col in res_row else ""]))[0]), 0)
+                         for col in epas.values()}
+        widget_keys = {col: f"epa_{resident_id}_{col}_{code}" for col, code in current_codes.items()}
+        loaded_versions = st.session_state.setdefault("epa_loaded_versions", {})
+        if resident_id not in loaded_versions or not all(k in st.session_state for k in widget_keys.values()):
+            version = res_row.get('row_version', 0)
+            loaded_versions[resident_id] = 0 if pd.isna(version) else int(version)
+
         updated_epas = {}
         for title, col in epas.items():
-            current_val = res_row[col] if col in res_row else ""
-            updated_epas[col] = st.selectbox(title, options=entrustment_levels,
-                                             index=entrustment_levels.index(current_val) if current_val in entrustment_levels else 0)
+            updated_epas[col] = st.selectbox(title, options=entrustment_levels, index=current_codes[col],
+                                             key=widget_keys[col])
 
         if st.button("Save EPA Levels"):
-            for col, val in updated_epas.items():
-                df.loc[df['full_name']==resident, col] = val
-            save_doctors(df)
-            st.success(f"EPA levels for {resident} updated successfully!")
+            try:
+                with phase("save", rows=1):
+                    update_doctor(resident_id, updated_epas, expected_version=loaded_versions[resident_id])
+                loaded_versions[resident_id] += 1
+                st.success(f"EPA levels for {resident} updated successfully!")
+            except ConflictError:
+                del loaded_versions[resident_id]
+                st.error(f"{resident}'s record was changed by another user since this page loaded. "
+                         "Their changes are shown on the next refresh; re-apply yours and save again.")
 
 # ---------------------------
 # Section 4: Resident Portfolio
@@ -369,90 +539,156 @@ elif menu == "4. Resident Portfolio":
     if df.empty:
         st.info("No doctors yet — add doctors in Section 1.")
     else:
-        resident = st.selectbox("Select resident", df['full_name'].tolist())
-        res_row = df[df['full_name']==resident].iloc[0]
+        logbook_mod = lazy_import("logbook")
+        logbook = logbook_mod.get_logbook()
+        index = roster_index()
+        resident_id = st.selectbox("Select resident", index.ids, format_func=index.label)
+        res_row = get_doctor(resident_id)
+        resident = res_row['full_name']
+
+        with st.expander("Log a procedure or teaching session"):
+            # Outside the form so the quantity input follows the chosen type
+            kind = st.selectbox("Type", list(logbook_mod.KINDS), format_func=lambda k: logbook_mod.KINDS[k][0])
+            with st.form(key='log_event_form', clear_on_submit=True):
+                col1, col2 = st.columns(2)
+                occurred = col1.date_input("Date", value=datetime.utcnow().date())
+                if kind == "teaching":
+                    quantity = col2.number_input("Hours", min_value=0.5, value=1.0, step=0.5)
+                else:
+                    quantity = col2.number_input("Count", min_value=1, value=1, step=1)
+                note = st.text_input("Note (optional)")
+                if st.form_submit_button("Add to logbook"):
+                    with phase("save", "logbook", rows=1):
+                        logbook.log([{"registration_id": resident_id, "kind": kind, "quantity": quantity,
+                                      "occurred_at": pd.Timestamp(occurred), "note": note,
+                                      "sponsoring_institution": res_row['sponsoring_institution']}])
+                    st.success(f"Logged {logbook_mod.KINDS[kind][0]} for {resident}.")
+
+        # Progress bars show the roster counts plus everything logged since
+        with phase("compute", "logbook totals"):
+            logged = logbook.resident_totals(resident_id)
+            res_row = logbook_mod.with_logged(res_row, logged)
         st.success(f"{resident} Portfolio Overview")
+        if logged:
+            st.caption(f"Includes {sum(t['events'] for t in logged.values())} logbook entries")
 
         # Teaching Progress
         st.markdown("### Teaching Progress")
-        teaching_hours = res_row['teaching_hours']
-        target_hours = 50
-        st.progress(min(teaching_hours/target_hours,1.0))
-        st.write(f"{teaching_hours} Hours / Target: {target_hours} hours/year")
-
-        # ------------------- Ultrasound Scans -------------------
-        st.markdown("### Ultrasound Scans")
-        st.write("**Sonography in Trauma**")
-        st.progress(res_row['ultrasound_trauma_done'] / res_row['ultrasound_trauma_total'])
-        st.write(f"{res_row['ultrasound_trauma_done']}/{res_row['ultrasound_trauma_total']}")
-
-        st.write("**Cardiac Ultrasound**")
-        st.progress(res_row['ultrasound_cardiac_done'] / res_row['ultrasound_cardiac_total'])
-        st.write(f"{res_row['ultrasound_cardiac_done']}/{res_row['ultrasound_cardiac_total']}")
-
-        st.write("**Lung Ultrasound**")
-        st.progress(res_row['ultrasound_lung_done'] / res_row['ultrasound_lung_total'])
-        st.write(f"{res_row['ultrasound_lung_done']}/{res_row['ultrasound_lung_total']}")
-
-        # ------------------- Resuscitations & Procedures -------------------
-        st.markdown("### Compulsory Procedures")
-        st.write("**Adult Medical Resuscitation**")
-        st.progress(res_row['adult_med_done'] / res_row['adult_med_total'])
-        st.write(f"{res_row['adult_med_done']}/{res_row['adult_med_total']}")
-
-        st.write("**Adult Trauma Resuscitation**")
-        st.progress(res_row['adult_trauma_done'] / res_row['adult_trauma_total'])
-        st.write(f"{res_row['adult_trauma_done']}/{res_row['adult_trauma_total']}")
-
-        st.write("**ED Bedside Ultrasound**")
-        st.progress(res_row['ed_ultrasound_done'] / res_row['ed_ultrasound_total'])
-        st.write(f"{res_row['ed_ultrasound_done']}/{res_row['ed_ultrasound_total']}")
+        teaching = teaching_progress(res_row)
+        st.progress(teaching['fraction'])
+        st.write(f"{teaching['hours']} Hours / Target: {teaching['target']} hours/year")
+
+        # ------------------- Ultrasound Scans / Resuscitations & Procedures -------------------
+        section = None
+        for item in procedure_progress(res_row):
+            if item['section'] != section:
+                section = item['section']
+                st.markdown(f"### {section}")
+            st.write(f"**{item['label']}**")
+            st.progress(item['fraction'])
+            st.write(f"{item['done']}/{item['total']}")
 
         # ------------------- Summative Assessments -------------------
         st.markdown("### Summative Assessments (Pass M.Med or Equivalent)")
-        assessments = pd.DataFrame([
-            ["MMed (EM) Part A", res_row['MMed_A_Status']],
-            ["MMed (EM) Part B", res_row['MMed_B_Status']],
-            ["MMed (EM) Part C", res_row['MMed_C_Status']],
-            ["Teaching and Administration Portfolio", res_row['Teaching_Admin_Status']],
-            ["Clinical Viva (9 stations)", res_row['Clinical_Viva_Status']],
-            ["CAT (2 hr written paper)", res_row['CAT_Status']],
-            ["ABMS MCQ Exam (200 MCQ, 6h 10min)", res_row['ABMS_MCQs_Status']]
-        ], columns=["Assessment", "Status"])
-
-        # Highlight Fail and Pending with nude colors
-        def highlight_status(val):
-            if val == 'Fail':
-                return 'background-color: #F5B7B1'  # soft nude red
-            elif val == 'Pending':
-                return 'background-color: #FFF3C4'  # soft nude yellow
-            else:
-                return ''
-
-        st.dataframe(assessments.style.applymap(highlight_status, subset=['Status']))
+        assessments = assessments_table(res_row)
+        with phase("render", "assessments", rows=len(assessments)) as span:
+            st.dataframe(span.payload(assessments.style.applymap(highlight_status, subset=['Status'])))
 
 
         # ------------------- EPA Milestones -------------------
         st.markdown("### EPA Milestone Tracking")
-        epa_cols = ['EPA1','EPA2','EPA3','EPA4','EPA5','EPA6','EPA7','EPA8']
-        epa_completed_cols = ['EPA1_Completed','EPA2_Completed','EPA3_Completed','EPA4_Completed',
-                            'EPA5_Completed','EPA6_Completed','EPA7_Completed','EPA8_Completed']
-        epa_targets = {"EPA1": "4b", "EPA2": "4b", "EPA3": "3a", "EPA4": "4b",
-                    "EPA5": "3b", "EPA6": "4b", "EPA7": "4b", "EPA8": "4b"}
+        epa_df = epa_milestones(res_row)
+        with phase("render", "epa milestones", rows=len(epa_df)) as span:
+            st.dataframe(span.payload(epa_df.style.applymap(highlight_not_completed, subset=['Completed'])))
 
-        epa_df = pd.DataFrame({
-            "EPA ID": [f"EPA{i}" for i in range(1,9)],
-            "Current Level": [res_row[col] for col in epa_cols],
-            "Target Level": [epa_targets[col] for col in epa_cols],
-            "Completed": [res_row[col] for col in epa_completed_cols]
-        })
 
-        # Highlight not completed in light orange
-        def highlight_not_completed(val):
-            if val != "Yes":
-                return 'background-color: #FFF3C4'  # light orange
-            else:
-                return ''
+# ---------------------------
+# Section 5: EPA Readiness
+# ---------------------------
+elif menu == "5. EPA Readiness":
+    st.header("EPA Readiness — Current vs Exit Entrustment Levels")
+    if df.empty:
+        st.info("No doctors yet — add doctors in Section 1.")
+    else:
+        px = lazy_import("plotly.express")
+        typed = typed_doctors(df)
 
-        st.dataframe(epa_df.style.applymap(highlight_not_completed, subset=['Completed']))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            institutions = st.multiselect("Sponsoring Institution", sorted(typed['sponsoring_institution'].dropna().unique()))
+        with col2:
+            years = st.multiselect("Resident year", [1,2,3,4,5])
+        with col3:
+            epa_filter = st.selectbox("Below target in", ["Any EPA"] + EPA_IDS)
 
+        with phase("compute", "readiness summary", rows=len(typed)):
+            mask = np.ones(len(typed), dtype=bool)
+            if institutions:
+                mask &= typed['sponsoring_institution'].isin(institutions).to_numpy()
+            if years:
+                mask &= typed['year'].isin(years).to_numpy(dtype=bool, na_value=False)
+            cohort = typed[mask]
+
+            summary = readiness_summary(cohort)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Residents", len(summary))
+        col2.metric("Meeting all exit targets", int(summary['ready'].sum()))
+        col3.metric("Average EPAs below target", f"{summary['gaps'].mean():.1f}" if len(summary) else "—")
+
+        st.subheader("Residents meeting exit target, by EPA")
+        with phase("compute", "attainment", rows=len(cohort)):
+            attainment = epa_attainment(cohort).reset_index()
+            attainment.columns = ['EPA', 'Share meeting target']
+            attainment['Target'] = [EPA_TARGETS[epa] for epa in attainment['EPA']]
+        with phase("chart", "attainment", rows=len(attainment)):
+            fig_ready = px.bar(attainment, x='EPA', y='Share meeting target', hover_data=['Target'],
+                               range_y=[0, 1], title="Share of Residents at or above Exit Entrustment Level")
+        with phase("render", "attainment") as span:
+            st.plotly_chart(span.payload(fig_ready), use_container_width=True)
+
+        st.subheader("Residents below target")
+        with phase("compute", "below target", rows=len(cohort)):
+            below_ids = below_target(cohort, None if epa_filter == "Any EPA" else epa_filter)['registration_id']
+            below_summary = summary[summary['registration_id'].isin(below_ids)].sort_values('gaps', ascending=False)
+            matrix = readiness_matrix(cohort).loc[below_summary['registration_id']]
+            below_summary = below_summary.join(matrix.replace({True: "✓", False: "✗"}), on='registration_id')
+        with phase("render", "below target", rows=len(below_summary)) as span:
+            st.dataframe(span.payload(below_summary.drop(columns=['ready'])), hide_index=True)
+
+
+# ---------------------------
+# Start-up timing
+# ---------------------------
+end_trace()
+record_render(menu, time.perf_counter() - _script_start)
+with st.sidebar.expander("Start-up timing"):
+    report = startup_report()
+    st.caption(f"Server process up for {report['uptime']:.0f}s")
+    st.dataframe(pd.DataFrame(
+        [(name, f"{secs * 1000:.0f} ms") for name, secs in report['imports'].items()],
+        columns=["Import", "First load"]), hide_index=True)
+    st.dataframe(pd.DataFrame(
+        [(name, f"{e['first'] * 1000:.0f} ms", f"{e['last'] * 1000:.0f} ms", e['count'])
+         for name, e in report['sections'].items()],
+        columns=["Section", "First render", "Last render", "Renders"]), hide_index=True)
+    st.download_button("Download timing report", startup_report_json(),
+                       file_name="startup_timing.json", mime="application/json")
+
+
+# ---------------------------
+# Instrumentation (admin only)
+# ---------------------------
+# Shown when the page is opened with ?admin=<APP_ADMIN_TOKEN>. Phase timing
+# is off unless APP_INSTRUMENTATION=1 or it is switched on here; the switch
+# applies to every session in this server process from their next rerun.
+_admin_token = os.environ.get("APP_ADMIN_TOKEN")
+if _admin_token and st.experimental_get_query_params().get("admin", [""])[0] == _admin_token:
+    with st.sidebar.expander("Instrumentation"):
+        set_instrumentation(st.checkbox("Record section phases", value=instrumentation_enabled()))
+        summary = pd.DataFrame(phase_summary())
+        if summary.empty:
+            st.caption("No traces recorded yet.")
+        else:
+            st.dataframe(summary.round({"mean_ms": 1, "max_ms": 1}), hide_index=True)
+            st.download_button("Download traces (JSON lines)", traces_jsonl(),
+                               file_name="traces.jsonl", mime="application/x-ndjson")
@@ -0,0 +1,318 @@
+import json
+import os
+import platform
+import socketserver
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import storage
+from aggregates import DashboardAggregates
+from mailer import MailDispatcher, build_message
+from outbox import render_reminders
+from portfolio import epa_milestones, procedure_progress, teaching_progress
+from rotations import build_rotations_table
+from schema import typed_roster
+from synthetic import generate_roster
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+# Times the app's hot paths against a synthetic roster on each storage
+# backend. Results are written as JSON tagged with the git commit, so runs
+# from two commits can be compared with --compare; a median more than
+# --threshold slower than the baseline counts as a regression.
+
+REMINDER_TEMPLATE = ("Dear {full_name},\n\nYour teaching hours ({teaching_hours}) are below the average "
+                     "({avg_hours:.1f}).\n")
+
+
+# ---------------------------
+# Local SMTP stub
+# ---------------------------
+# Just enough SMTP for smtplib: accepts every message and counts it.
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: bytes):
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self):
+        self._reply(b"220 bench stub")
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    self.server.count()
+                    self._reply(b"250 OK")
+                continue
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self._reply(b"250-bench stub")
+                self._reply(b"250 8BITMIME")
+            elif command == b"DATA":
+                in_data = True
+                self._reply(b"354 End data with <CR><LF>.<CR><LF>")
+            elif command == b"QUIT":
+                self._reply(b"221 Bye")
+                return
+            else:
+                self._reply(b"250 OK")
+
+
+class SmtpStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _SmtpHandler)
+        self.received = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.received += 1
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+# ---------------------------
+# Cases
+# ---------------------------
+# Each case gets the backend's freshly loaded roster and returns a
+# zero-argument callable to time; setup done before returning is untimed.
+
+def case_load_cold(backend, df, rng):
+    def run():
+        backend.cache.invalidate()
+        storage.load_doctors()
+    return run
+
+
+def case_load_warm(backend, df, rng):
+    storage.load_doctors()
+    return storage.load_doctors
+
+
+def case_save_one_edit(backend, df, rng):
+    def run():
+        base = storage.load_doctors()
+        edited = base.copy()
+        edited.iloc[rng.integers(len(edited)), edited.columns.get_loc("teaching_hours")] = float(rng.integers(100))
+        storage.save_doctors(edited, base)
+    return run
+
+
+def case_aggregates_full(backend, df, rng):
+    return lambda: DashboardAggregates.from_roster(df)
+
+
+def case_aggregates_incremental(backend, df, rng):
+    storage.dashboard_aggregates()
+    return storage.dashboard_aggregates
+
+
+def case_rotations_table(backend, df, rng):
+    return lambda: build_rotations_table(df)
+
+
+def case_typed_roster(backend, df, rng):
+    return lambda: typed_roster(df)
+
+
+def case_update_epa(backend, df, rng):
+    ids = df["registration_id"].to_numpy()
+    return lambda: storage.update_doctor(ids[rng.integers(len(ids))], {"EPA1": "3a"})
+
+
+def case_portfolio_lookup(backend, df, rng):
+    ids = df["registration_id"].to_numpy()
+    storage.roster_index()
+
+    def run():
+        current = storage.load_doctors()
+        row = storage.roster_index().row(current, ids[rng.integers(len(ids))])
+        teaching_progress(row)
+        procedure_progress(row)
+        epa_milestones(row)
+    return run
+
+
+def case_below_average(backend, df, rng):
+    storage.typed_doctors()
+
+    def run():
+        current = storage.load_doctors()
+        avg_hours = storage.dashboard_aggregates().teaching_average
+        return current[(storage.typed_doctors(current)["teaching_hours"] < avg_hours).to_numpy()]
+    return run
+
+
+CASES = {
+    "load_cold": case_load_cold,
+    "load_warm": case_load_warm,
+    "save_one_edit": case_save_one_edit,
+    "aggregates_full": case_aggregates_full,
+    "aggregates_incremental": case_aggregates_incremental,
+    "rotations_table": case_rotations_table,
+    "typed_roster": case_typed_roster,
+    "update_epa": case_update_epa,
+    "portfolio_lookup": case_portfolio_lookup,
+    "below_average": case_below_average,
+}
+
+
+def _timings(fn, repeat: int) -> dict:
+    fn()  # warm-up, not recorded
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "max": max(times), "repeat": repeat}
+
+
+def _make_backend(kind: str, workdir: str, roster: pd.DataFrame):
+    if kind == "csv":
+        backend = storage.CsvBackend(os.path.join(workdir, "roster.csv"))
+    else:
+        backend = storage.SqliteBackend(os.path.join(workdir, "roster.db"))
+    backend.replace(roster)
+    return backend
+
+
+def bench_backend(kind: str, roster: pd.DataFrame, repeat: int, seed: int, cases=None) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        backend = _make_backend(kind, workdir, roster)
+        storage.set_backend(backend)
+        try:
+            for name, case in CASES.items():
+                if cases and name not in cases:
+                    continue
+                fn = case(backend, storage.load_doctors(), np.random.default_rng(seed))
+                results[name] = _timings(fn, repeat)
+        finally:
+            storage.set_backend(None)
+    return results
+
+
+def bench_reminders(roster: pd.DataFrame, messages: int, workers: int, repeat: int) -> dict:
+    """Render and send `messages` reminders through MailDispatcher to a local stub."""
+    below = roster.head(messages)
+    with SmtpStub() as stub:
+        host, port = stub.server_address
+
+        def run():
+            rendered = render_reminders(below, "bench@example.com", "Teaching Hours Reminder",
+                                        REMINDER_TEMPLATE, avg_hours=42.0)
+            jobs = [(i, build_message(m["sender"], m["recipient"], m["subject"], m["body"]))
+                    for i, m in enumerate(rendered)]
+            dispatcher = MailDispatcher(host=host, port=port, use_tls=False, workers=workers, rate_per_sec=0)
+            errors = [error for _, error in dispatcher.send(jobs) if error is not None]
+            if errors:
+                raise errors[0]
+
+        result = _timings(run, repeat)
+    result.update(messages=len(below), workers=workers, received=stub.received)
+    return result
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_suite(rows: int, seed: int = 0, repeat: int = 5, backends=("csv", "sqlite"), cases=None,
+              messages: int = 200, smtp_workers: int = 4) -> dict:
+    roster = generate_roster(rows, seed)
+    report = {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count(), "pandas": pd.__version__, "numpy": np.__version__},
+        "rows": rows,
+        "seed": seed,
+        "results": {},
+    }
+    for kind in backends:
+        for name, timing in bench_backend(kind, roster, repeat, seed, cases).items():
+            report["results"][f"{kind}/{name}"] = timing
+    if messages and (not cases or "reminders" in cases):
+        report["results"]["smtp/reminders"] = bench_reminders(roster, messages, smtp_workers, repeat)
+    return report
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> tuple:
+    """Return (rows, regressions): (name, baseline median, current median, ratio)
+    for each shared result, and the names whose median grew by more than `threshold`."""
+    rows, regressions = [], []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else float("inf")
+        rows.append((name, base["median"], result["median"], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark roster load/save, dashboard, update and email paths")
+    parser.add_argument("--rows", type=int, default=10000, help="Synthetic roster size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (after one warm-up)")
+    parser.add_argument("--backend", action="append", choices=["csv", "sqlite"],
+                        help="Backend to benchmark (repeatable; default both)")
+    parser.add_argument("--case", action="append", choices=list(CASES) + ["reminders"],
+                        help="Only run this case (repeatable)")
+    parser.add_argument("--messages", type=int, default=200, help="Reminder emails per run (0 to skip)")
+    parser.add_argument("--smtp-workers", type=int, default=4)
+    parser.add_argument("--out", help="JSON results file (default: bench_results/<commit>-<rows>.json)")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed median slowdown before failing")
+    args = parser.parse_args()
+
+    report = run_suite(args.rows, args.seed, args.repeat, tuple(args.backend or ("csv", "sqlite")),
+                       args.case, args.messages, args.smtp_workers)
+
+    out = args.out or os.path.join("bench_results", f"{report['commit'][:12] or 'nocommit'}-{args.rows}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{args.rows} residents, commit {report['commit'][:12]}{' (dirty)' if report['dirty'] else ''}")
+    for name, result in report["results"].items():
+        print(f"  {name:<32} median {result['median'] * 1000:9.2f} ms   min {result['min'] * 1000:9.2f} ms")
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("rows") != report["rows"]:
+            print(f"Warning: baseline used {baseline.get('rows')} rows, this run {report['rows']}")
+        rows, regressions = compare(baseline, report, args.threshold)
+        print(f"Compared with {args.compare} (commit {baseline.get('commit', '')[:12]}):")
+        for name, before, after, ratio in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            print(f"  {name:<32} {before * 1000:9.2f} -> {after * 1000:9.2f} ms  x{ratio:.2f}{flag}")
+        if regressions:
+            sys.exit(1)
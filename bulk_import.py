@@ -0,0 +1,200 @@
+import io
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rotations import join_rotations
+from schema import (ENTRUSTMENT_LEVELS, EPA_COMPLETED_COLS, EPA_IDS, PROCEDURE_COLS,
+                    PROCEDURE_DEFAULT_TOTALS, SPONSORING_INSTITUTIONS, STATUS_COLS, STATUS_VALUES,
+                    level_codes)
+from storage import COLUMNS, append_doctors, load_doctors
+
+CHUNK_SIZE = 5000
+
+NUMERIC_COLUMNS = ["age", "year", "teaching_hours", "row_version"] + PROCEDURE_COLS
+
+
+# ---------------------------
+# Bulk cohort import
+# ---------------------------
+# Uploaded spreadsheets are read in chunks and validated against the same
+# rules as the Add Doctor form. Valid rows are staged in a temporary CSV
+# and committed to the roster in one batched write at the end; rejected
+# rows are collected with their reasons in a separate rejects report.
+# Only one chunk (plus the set of registration IDs) is held in memory.
+
+class ImportResult:
+    def __init__(self, imported: int, rejected: int, rejects_csv: bytes):
+        self.imported = imported
+        self.rejected = rejected
+        self.rejects_csv = rejects_csv
+
+
+def read_chunks(source, filename: str, chunksize: int = CHUNK_SIZE):
+    """Yield DataFrame chunks of all-text values from a CSV or Excel file."""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        yield from _excel_chunks(source, chunksize)
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False)
+
+
+def _excel_chunks(source, chunksize: int):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("Excel import requires openpyxl (pip install openpyxl)") from None
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+        batch = []
+        for row in rows:
+            batch.append(["" if v is None else str(v) for v in row])
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def _text(chunk: pd.DataFrame, col: str) -> pd.Series:
+    if col not in chunk:
+        return pd.Series("", index=chunk.index)
+    return chunk[col].fillna("").astype(str).str.strip()
+
+
+def _number(chunk: pd.DataFrame, col: str, default=np.nan) -> pd.Series:
+    text = _text(chunk, col)
+    values = pd.to_numeric(text, errors="coerce")
+    return values.where(text != "", default)
+
+
+def validate_chunk(chunk: pd.DataFrame, seen_ids: set):
+    """Split a raw chunk into (valid rows in roster layout, rejects with reasons).
+
+    `seen_ids` holds registration IDs already in the roster or accepted from
+    earlier chunks; it is updated with this chunk's valid IDs.
+    """
+    errors = pd.Series("", index=chunk.index)
+
+    def fail(mask, message):
+        nonlocal errors
+        errors = errors.where(~mask, errors + message + "; ")
+
+    out = pd.DataFrame(index=chunk.index)
+    for col in ["full_name", "gender", "nationality", "medical_school", "registration_id", "email"]:
+        out[col] = _text(chunk, col)
+    out["phone"] = _text(chunk, "phone").str.replace(",", "", regex=False)
+    fail(out["full_name"] == "", "full_name is required")
+    fail(out["registration_id"] == "", "registration_id is required")
+
+    age = _number(chunk, "age")
+    fail(~age.between(18, 80) | (age % 1 != 0), "age must be a whole number from 18 to 80")
+    out["age"] = age
+
+    year = _number(chunk, "year")
+    fail(~year.isin([1, 2, 3, 4, 5]), "year must be 1-5")
+    out["year"] = year
+
+    hours = _number(chunk, "teaching_hours", 0.0)
+    fail(~(hours >= 0), "teaching_hours must be a non-negative number")
+    out["teaching_hours"] = hours
+
+    institution = _text(chunk, "sponsoring_institution")
+    fail(~institution.isin(SPONSORING_INSTITUTIONS),
+         "sponsoring_institution must be one of " + "/".join(SPONSORING_INSTITUTIONS))
+    out["sponsoring_institution"] = institution
+
+    out["rotations"] = _text(chunk, "rotations").map(join_rotations)
+    created = _text(chunk, "created_at")
+    out["created_at"] = created.where(created != "", datetime.utcnow().isoformat())
+
+    for col in PROCEDURE_COLS:
+        count = _number(chunk, col, PROCEDURE_DEFAULT_TOTALS.get(col, 0))
+        fail(~(count >= 0) | (count % 1 != 0), f"{col} must be a non-negative whole number")
+        out[col] = count
+
+    for col in STATUS_COLS:
+        status = _text(chunk, col).replace("", "Pending")
+        fail(~status.isin(STATUS_VALUES), f"{col} must be Pass/Fail/Pending")
+        out[col] = status
+
+    for col in EPA_IDS:
+        level = _text(chunk, col).replace("", "1")
+        fail(level_codes(level) < 0, f"{col} must be an entrustment level ({', '.join(ENTRUSTMENT_LEVELS)})")
+        out[col] = level
+
+    for col in EPA_COMPLETED_COLS:
+        completed = _text(chunk, col).replace("", "No")
+        fail(~completed.isin(["Yes", "No"]), f"{col} must be Yes/No")
+        out[col] = completed
+
+    ids = out["registration_id"]
+    duplicate = ids.isin(seen_ids) | ids.duplicated(keep="first")
+    fail(duplicate & (ids != ""), "registration_id already exists")
+
+    valid = errors == ""
+    seen_ids.update(ids[valid])
+    accepted = out[valid].reindex(columns=COLUMNS)
+    accepted["row_version"] = 0
+    for col in ["age", "year"] + PROCEDURE_COLS:
+        accepted[col] = accepted[col].astype("int64")
+
+    rejects = chunk[~valid].copy()
+    rejects.insert(0, "errors", errors[~valid].str.rstrip("; "))
+    return accepted, rejects
+
+
+def import_roster(source, filename: str, chunksize: int = CHUNK_SIZE) -> ImportResult:
+    seen_ids = set(load_doctors()["registration_id"].dropna().astype(str))
+    staging = tempfile.NamedTemporaryFile("w+", suffix=".csv", newline="", delete=False)
+    rejects = io.StringIO()
+    n_rejected = 0
+    row_offset = 0
+    try:
+        with staging:
+            try:
+                for i, chunk in enumerate(read_chunks(source, filename, chunksize)):
+                    # Report spreadsheet row numbers (header is row 1)
+                    chunk.index = np.arange(len(chunk)) + row_offset + 2
+                    row_offset += len(chunk)
+                    accepted, rejected = validate_chunk(chunk, seen_ids)
+                    accepted.to_csv(staging, header=(i == 0), index=False)
+                    if not rejected.empty:
+                        rejected.to_csv(rejects, header=(n_rejected == 0), index_label="row")
+                        n_rejected += len(rejected)
+            except pd.errors.EmptyDataError:
+                pass  # an empty file: nothing to import
+        if row_offset == 0:
+            return ImportResult(0, 0, b"")
+        # Read validated text back verbatim: phone "+65..." or "08..." must not
+        # be re-parsed as a number, nor "NA" as missing
+        staged = pd.read_csv(staging.name, chunksize=chunksize, keep_default_na=False, na_values=[""],
+                             dtype={c: str for c in COLUMNS if c not in NUMERIC_COLUMNS})
+        imported = append_doctors(staged)
+    finally:
+        os.remove(staging.name)
+    return ImportResult(imported, n_rejected, rejects.getvalue().encode())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import residents from a CSV or Excel file")
+    parser.add_argument("file")
+    parser.add_argument("--rejects", default="rejects.csv", help="Where to write rejected rows")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as f:
+        result = import_roster(f, args.file, args.chunksize)
+    print(f"Imported {result.imported} residents, rejected {result.rejected}")
+    if result.rejected:
+        with open(args.rejects, "wb") as f:
+            f.write(result.rejects_csv)
+        print(f"Rejected rows written to {args.rejects}")
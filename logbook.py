@@ -0,0 +1,353 @@
+import contextlib
+import glob
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from portfolio import PROCEDURES
+
+LOGBOOK_DIR = os.environ.get("LOGBOOK_DIR", "logbook")
+
+# Event kind -> (label, roster column the logged quantity adds to)
+KINDS = {done[:-len("_done")]: (label, done) for _, label, done, _ in PROCEDURES}
+KINDS["teaching"] = ("Teaching session (hours)", "teaching_hours")
+
+EVENT_COLUMNS = ["event_id", "registration_id", "kind", "quantity", "occurred_at", "logged_at",
+                 "sponsoring_institution", "note"]
+
+
+# ---------------------------
+# Procedure logbook
+# ---------------------------
+# One row per logged scan, resuscitation or teaching session. Events are
+# append-only Parquet files partitioned by month of occurrence
+# (month=YYYY-MM/part-*.parquet); every log() call writes a new file and
+# never rewrites old ones. A SQLite manifest lists the files that make up
+# the log and keeps rollups updated in the same transaction as each file
+# is registered:
+#   resident_totals  per resident and kind, read by the portfolio
+#   monthly_totals   per month, kind and institution, for cohort trends
+# so neither the portfolio nor the trend charts scan the log itself.
+#
+# The roster's *_done and teaching_hours columns remain the baseline from
+# before the logbook; logged quantities are added on top (with_logged).
+
+class Logbook:
+    def __init__(self, root: str = LOGBOOK_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, "rollups.db")
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    month TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'active'
+                )""")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS resident_totals (
+                    registration_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    quantity REAL NOT NULL,
+                    last_at TEXT,
+                    PRIMARY KEY (registration_id, kind)
+                )""")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS monthly_totals (
+                    month TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    sponsoring_institution TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    quantity REAL NOT NULL,
+                    PRIMARY KEY (month, kind, sponsoring_institution)
+                )""")
+        self.recover()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # ---------------------------
+    # Writing
+    # ---------------------------
+
+    def _frame(self, events) -> pd.DataFrame:
+        df = pd.DataFrame(events).copy()
+        missing = {"registration_id", "kind", "occurred_at"} - set(df.columns)
+        if missing:
+            raise ValueError(f"Events are missing {', '.join(sorted(missing))}")
+        unknown = sorted(set(df["kind"]) - set(KINDS))
+        if unknown:
+            raise ValueError(f"Unknown event kind(s): {', '.join(map(str, unknown))}")
+        df["registration_id"] = df["registration_id"].astype(str).str.strip()
+        if (df["registration_id"] == "").any():
+            raise ValueError("Every event needs a registration_id")
+        df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce") if "quantity" in df else 1.0
+        df["quantity"] = df["quantity"].astype("float64")
+        if df["quantity"].isna().any() or (df["quantity"] <= 0).any():
+            raise ValueError("Quantities must be positive numbers")
+        if (df.loc[df["kind"] != "teaching", "quantity"] % 1 != 0).any():
+            raise ValueError("Procedure counts must be whole numbers")
+        df["occurred_at"] = pd.to_datetime(df["occurred_at"], utc=True)
+        df["logged_at"] = pd.Timestamp.now(tz="UTC")
+        df["event_id"] = [uuid.uuid4().hex for _ in range(len(df))]
+        for col in ("sponsoring_institution", "note"):
+            df[col] = df[col].fillna("").astype(str) if col in df else ""
+        return df[EVENT_COLUMNS]
+
+    def _write_file(self, month: str, part: pd.DataFrame, prefix: str = "part") -> str:
+        directory = os.path.join(self.root, f"month={month}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"{prefix}-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = os.path.join(directory, f".{name}.tmp")
+        part.to_parquet(tmp, index=False)
+        os.replace(tmp, os.path.join(directory, name))
+        return os.path.join(f"month={month}", name)
+
+    def log(self, events) -> int:
+        """Append `events` (dicts or a DataFrame with registration_id, kind,
+        occurred_at and optionally quantity, sponsoring_institution, note)."""
+        df = self._frame(events)
+        if df.empty:
+            return 0
+        months = df["occurred_at"].dt.strftime("%Y-%m")
+        # Files are written while holding the manifest lock, so recover() in
+        # another process never sees a part file this call has yet to register
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            for month, part in df.groupby(months, sort=True):
+                path = self._write_file(month, part.reset_index(drop=True))
+                self._register(con, path, month, part)
+        return len(df)
+
+    def _register(self, con, path: str, month: str, part: pd.DataFrame):
+        con.execute("INSERT INTO files (path, month, rows) VALUES (?, ?, ?)", (path, month, len(part)))
+        by_resident = part.groupby(["registration_id", "kind"]).agg(
+            events=("quantity", "size"), quantity=("quantity", "sum"), last_at=("occurred_at", "max"))
+        con.executemany("""
+            INSERT INTO resident_totals (registration_id, kind, events, quantity, last_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (registration_id, kind) DO UPDATE SET
+                events = events + excluded.events,
+                quantity = quantity + excluded.quantity,
+                last_at = max(coalesce(last_at, ''), excluded.last_at)""",
+            [(rid, kind, int(n), float(q), last.isoformat())
+             for (rid, kind), n, q, last in zip(by_resident.index, by_resident["events"],
+                                               by_resident["quantity"], by_resident["last_at"])])
+        by_month = part.groupby(["kind", "sponsoring_institution"]).agg(
+            events=("quantity", "size"), quantity=("quantity", "sum"))
+        con.executemany("""
+            INSERT INTO monthly_totals (month, kind, sponsoring_institution, events, quantity)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (month, kind, sponsoring_institution) DO UPDATE SET
+                events = events + excluded.events,
+                quantity = quantity + excluded.quantity""",
+            [(month, kind, inst, int(n), float(q))
+             for (kind, inst), n, q in zip(by_month.index, by_month["events"], by_month["quantity"])])
+
+    # ---------------------------
+    # Maintenance
+    # ---------------------------
+
+    def _on_disk(self) -> list:
+        pattern = os.path.join(self.root, "month=*", "*.parquet")
+        return sorted(os.path.relpath(p, self.root) for p in glob.glob(pattern))
+
+    def recover(self):
+        """Finish work a crash interrupted: register part files written but
+        not yet in the manifest, drop unregistered compaction output, and
+        delete files already folded into a compacted one."""
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            known = dict(con.execute("SELECT path, status FROM files"))
+            for path in self._on_disk():
+                if path in known:
+                    continue
+                if os.path.basename(path).startswith("part-"):
+                    month = os.path.dirname(path).split("=", 1)[1]
+                    self._register(con, path, month, pd.read_parquet(os.path.join(self.root, path)))
+                else:
+                    os.remove(os.path.join(self.root, path))
+            self._remove_compacted(con)
+
+    def _remove_compacted(self, con):
+        for (path,) in con.execute("SELECT path FROM files WHERE status = 'compacted'").fetchall():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.root, path))
+            con.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def compact(self, month: str) -> int:
+        """Merge a month's part files into one. Rollups are unaffected."""
+        with self._connect() as con:
+            # Held throughout, like log(), so recover() never deletes the
+            # compacted file before it is registered
+            con.execute("BEGIN IMMEDIATE")
+            paths = [p for (p,) in con.execute(
+                "SELECT path FROM files WHERE month = ? AND status = 'active' ORDER BY path", (month,))]
+            if len(paths) < 2:
+                return len(paths)
+            merged = pd.concat([pd.read_parquet(os.path.join(self.root, p)) for p in paths], ignore_index=True)
+            merged = merged.sort_values("occurred_at", kind="stable").reset_index(drop=True)
+            path = self._write_file(month, merged, prefix="compact")
+            con.executemany("UPDATE files SET status = 'compacted' WHERE path = ?", [(p,) for p in paths])
+            con.execute("INSERT INTO files (path, month, rows) VALUES (?, ?, ?)", (path, month, len(merged)))
+            self._remove_compacted(con)
+        return len(paths)
+
+    def rebuild_rollups(self):
+        """Recompute every rollup from the event files."""
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            files = con.execute("SELECT path, month FROM files WHERE status = 'active'").fetchall()
+            con.execute("DELETE FROM files")
+            con.execute("DELETE FROM resident_totals")
+            con.execute("DELETE FROM monthly_totals")
+            for path, month in files:
+                self._register(con, path, month, pd.read_parquet(os.path.join(self.root, path)))
+
+    # ---------------------------
+    # Reading
+    # ---------------------------
+
+    def months(self) -> list:
+        with self._connect() as con:
+            return [m for (m,) in con.execute("SELECT DISTINCT month FROM files ORDER BY month")]
+
+    def resident_totals(self, registration_id: str) -> dict:
+        """{kind: {"events", "quantity", "last_at"}} for one resident."""
+        with self._connect() as con:
+            rows = con.execute("SELECT kind, events, quantity, last_at FROM resident_totals "
+                               "WHERE registration_id = ?", (str(registration_id),)).fetchall()
+        return {kind: {"events": n, "quantity": q, "last_at": last} for kind, n, q, last in rows}
+
+    def totals_frame(self) -> pd.DataFrame:
+        """Logged quantity per resident (index) and roster column (columns)."""
+        with self._connect() as con:
+            rows = pd.read_sql_query("SELECT registration_id, kind, quantity FROM resident_totals", con)
+        rows["column"] = rows["kind"].map(lambda kind: KINDS[kind][1])
+        return rows.pivot_table(index="registration_id", columns="column", values="quantity",
+                                aggfunc="sum", fill_value=0.0)
+
+    def monthly_trend(self, kinds=None, institutions=None) -> pd.DataFrame:
+        """Events and quantity per month and kind, from the monthly rollup."""
+        query = "SELECT month, kind, SUM(events) AS events, SUM(quantity) AS quantity FROM monthly_totals"
+        where, params = [], []
+        if kinds:
+            where.append(f"kind IN ({', '.join('?' * len(kinds))})")
+            params += list(kinds)
+        if institutions:
+            where.append(f"sponsoring_institution IN ({', '.join('?' * len(institutions))})")
+            params += list(institutions)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " GROUP BY month, kind ORDER BY month, kind"
+        with self._connect() as con:
+            trend = pd.read_sql_query(query, con, params=params)
+        trend["label"] = trend["kind"].map(lambda kind: KINDS[kind][0])
+        return trend
+
+    def events(self, months=None, registration_id: str = None) -> pd.DataFrame:
+        """Raw events, reading only the partitions for `months` if given."""
+        query, params = "SELECT path FROM files WHERE status = 'active'", []
+        if months:
+            query += f" AND month IN ({', '.join('?' * len(months))})"
+            params = list(months)
+        with self._connect() as con:
+            paths = [p for (p,) in con.execute(query + " ORDER BY path", params)]
+        filters = [("registration_id", "==", str(registration_id))] if registration_id is not None else None
+        frames = [pd.read_parquet(os.path.join(self.root, p), filters=filters) for p in paths]
+        if not frames:
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+
+# ---------------------------
+# Applying logged totals
+# ---------------------------
+
+def with_logged(row: pd.Series, totals: dict) -> pd.Series:
+    """A resident's roster row with their logged quantities added to the
+    done/teaching columns the portfolio progress bars read."""
+    if not totals:
+        return row
+    row = row.copy()
+    for kind, total in totals.items():
+        col = KINDS[kind][1]
+        base = pd.to_numeric(row.get(col), errors="coerce")
+        value = (0 if pd.isna(base) else base) + total["quantity"]
+        row[col] = int(value) if float(value).is_integer() else value
+    return row
+
+
+def add_logged(df: pd.DataFrame, totals: pd.DataFrame) -> pd.DataFrame:
+    """with_logged for a whole roster, given Logbook.totals_frame()."""
+    if totals.empty:
+        return df
+    df = df.copy()
+    logged = totals.reindex(df["registration_id"].astype(str)).fillna(0.0).to_numpy()
+    for i, col in enumerate(totals.columns):
+        base = pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy()
+        values = base + logged[:, i]
+        df[col] = values.astype("int64") if (values % 1 == 0).all() else values
+    return df
+
+
+def read_events(path: str) -> pd.DataFrame:
+    """Events from a CSV file, with registration IDs, notes and institutions
+    kept verbatim ("0042" stays "0042", "NA" is not missing)."""
+    return pd.read_csv(path, keep_default_na=False, na_values=[""],
+                       dtype={c: str for c in ("registration_id", "kind", "sponsoring_institution", "note")})
+
+
+_logbook = None
+_logbook_lock = threading.Lock()
+
+def get_logbook() -> Logbook:
+    """The process-wide logbook; recover() runs once, when it is created."""
+    global _logbook
+    with _logbook_lock:
+        if _logbook is None:
+            _logbook = Logbook()
+        return _logbook
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Procedure logbook tools")
+    parser.add_argument("--dir", default=LOGBOOK_DIR, help="Logbook directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Append events from a CSV file")
+    imp.add_argument("csv", help="Columns: registration_id, kind, occurred_at, quantity, note")
+    comp = sub.add_parser("compact", help="Merge each month's part files into one")
+    comp.add_argument("--month", action="append", help="YYYY-MM (repeatable; default every month)")
+    sub.add_parser("rebuild-rollups", help="Recompute rollups from the event files")
+    args = parser.parse_args()
+
+    book = Logbook(args.dir)
+    if args.command == "import":
+        from storage import load_doctors
+
+        events = read_events(args.csv)
+        if "sponsoring_institution" not in events:
+            roster = load_doctors()
+            institutions = dict(zip(roster["registration_id"].astype(str), roster["sponsoring_institution"]))
+            events["sponsoring_institution"] = events["registration_id"].astype(str).map(institutions)
+        print(f"Logged {book.log(events)} events from {args.csv}")
+    elif args.command == "compact":
+        for month in args.month or book.months():
+            print(f"{month}: merged {book.compact(month)} files")
+    elif args.command == "rebuild-rollups":
+        book.rebuild_rollups()
+        print(f"Rebuilt rollups in {book.path}")
@@ -0,0 +1,131 @@
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+
+
+def build_message(sender: str, recipient: str, subject: str, body: str) -> MIMEMultipart:
+    message = MIMEMultipart()
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "plain"))
+    return message
+
+
+# ---------------------------
+# Rate limiting
+# ---------------------------
+
+class RateLimiter:
+    """Token bucket shared by all sender threads; rate <= 0 disables it."""
+
+    def __init__(self, rate_per_sec: float):
+        self.rate = rate_per_sec
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + 1.0 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# ---------------------------
+# Pooled SMTP dispatch
+# ---------------------------
+# Each worker thread keeps one authenticated connection open for the whole
+# batch, so STARTTLS and login happen once per worker instead of once per
+# recipient.
+
+class MailDispatcher:
+    def __init__(self, username: str = "", password: str = "", host: str = SMTP_HOST,
+                 port: int = SMTP_PORT, use_tls: bool = True, workers: int = 4,
+                 rate_per_sec: float = 5.0, timeout: float = 30.0):
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate_per_sec)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _connection(self) -> smtplib.SMTP:
+        server = getattr(self._local, "server", None)
+        if server is None:
+            server = self._connect()
+            self._local.server = server
+            with self._connections_lock:
+                self._connections.append(server)
+        return server
+
+    def _drop_connection(self):
+        server = getattr(self._local, "server", None)
+        self._local.server = None
+        if server is not None:
+            with self._connections_lock:
+                if server in self._connections:
+                    self._connections.remove(server)
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def send_one(self, message):
+        """Send a single message on this thread's pooled connection."""
+        self.limiter.wait()
+        try:
+            self._connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections get closed by the server; retry once on a new one
+            self._drop_connection()
+            self._connection().send_message(message)
+        except (smtplib.SMTPException, OSError):
+            self._drop_connection()
+            raise
+
+    def send(self, jobs):
+        """Send `jobs`, an iterable of (key, message) pairs.
+
+        Yields (key, error) as each send completes, in completion order;
+        error is None on success.
+        """
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {pool.submit(self.send_one, message): key for key, message in jobs}
+                for future in as_completed(futures):
+                    yield futures[future], future.exception()
+        finally:
+            self.close()
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for server in connections:
+            try:
+                server.quit()
+            except Exception:
+                pass
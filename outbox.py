@@ -0,0 +1,237 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+from mailer import MailDispatcher, build_message
+from perf import record_event
+
+OUTBOX_DB = os.environ.get("OUTBOX_DB", "outbox.db")
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30.0       # seconds before the first retry, doubled each attempt
+BACKOFF_MAX = 3600.0
+POLL_INTERVAL = 2.0
+BATCH_SIZE = 50
+
+
+# ---------------------------
+# Persistent outbox
+# ---------------------------
+# Rendered reminders are written here when "Send Emails" is pressed and
+# delivered by a background thread, so closing the tab or re-running the
+# script never abandons a batch halfway. (registration_id, campaign) is
+# unique, so re-sending a campaign only queues residents not already in it.
+
+class Outbox:
+    def __init__(self, path: str = OUTBOX_DB):
+        self.path = path
+        with self._connect() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY,
+                    registration_id TEXT NOT NULL,
+                    campaign TEXT NOT NULL,
+                    full_name TEXT,
+                    sender TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL,
+                    UNIQUE (registration_id, campaign)
+                )""")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def enqueue(self, messages, campaign: str) -> "EnqueueResult":
+        """Queue `messages`, dicts with registration_id, full_name, sender,
+        recipient, subject and body.
+
+        Messages without a registration_id or recipient are not queued and
+        are returned as invalid; only a resident already in `campaign`
+        counts as a duplicate.
+        """
+        now = time.time()
+        rows, invalid = [], []
+        for m in messages:
+            if _blank(m.get("registration_id")) or _blank(m.get("recipient")):
+                invalid.append(m)
+                continue
+            rows.append((str(m["registration_id"]), campaign, m.get("full_name"), m["sender"], m["recipient"],
+                         m["subject"], m["body"], now))
+        with self._connect() as con:
+            before = con.total_changes
+            con.executemany("""
+                INSERT INTO outbox
+                    (registration_id, campaign, full_name, sender, recipient, subject, body, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (registration_id, campaign) DO NOTHING""", rows)
+            queued = con.total_changes - before
+        return EnqueueResult(queued, len(rows) - queued, invalid)
+
+    def claim(self, senders, limit: int = BATCH_SIZE):
+        """Mark up to `limit` due messages from `senders` as sending and return them."""
+        senders = list(senders)
+        if not senders:
+            return []
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            rows = con.execute(f"""
+                SELECT id, registration_id, full_name, sender, recipient, subject, body, attempts
+                FROM outbox WHERE status = 'pending' AND next_attempt_at <= ?
+                AND sender IN ({", ".join("?" * len(senders))})
+                ORDER BY id LIMIT ?""", (time.time(), *senders, limit)).fetchall()
+            con.executemany("UPDATE outbox SET status = 'sending' WHERE id = ?", [(r[0],) for r in rows])
+        keys = ["id", "registration_id", "full_name", "sender", "recipient", "subject", "body", "attempts"]
+        return [dict(zip(keys, r)) for r in rows]
+
+    def mark_sent(self, message_id: int):
+        with self._connect() as con:
+            con.execute("UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                        (time.time(), message_id))
+
+    def mark_failed(self, message_id: int, attempts: int, error: str):
+        attempts += 1
+        if attempts >= MAX_ATTEMPTS:
+            status, next_attempt = "failed", 0
+        else:
+            status = "pending"
+            next_attempt = time.time() + min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+        with self._connect() as con:
+            con.execute("""
+                UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+                WHERE id = ?""", (status, attempts, next_attempt, error, message_id))
+
+    def requeue_interrupted(self):
+        """Return messages left 'sending' by a crashed worker to the queue."""
+        with self._connect() as con:
+            con.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+
+    def retry_failed(self, campaign: str = None):
+        sql = "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = 0 WHERE status = 'failed'"
+        params = ()
+        if campaign is not None:
+            sql += " AND campaign = ?"
+            params = (campaign,)
+        with self._connect() as con:
+            con.execute(sql, params)
+
+    def status_counts(self, campaign: str = None) -> dict:
+        sql = "SELECT status, COUNT(*) FROM outbox"
+        params = ()
+        if campaign is not None:
+            sql += " WHERE campaign = ?"
+            params = (campaign,)
+        with self._connect() as con:
+            counts = dict(con.execute(sql + " GROUP BY status", params).fetchall())
+        return {s: counts.get(s, 0) for s in ("pending", "sending", "sent", "failed")}
+
+    def failures(self, campaign: str = None, limit: int = 100):
+        sql = "SELECT full_name, recipient, attempts, last_error FROM outbox WHERE status = 'failed'"
+        params = ()
+        if campaign is not None:
+            sql += " AND campaign = ?"
+            params = (campaign,)
+        with self._connect() as con:
+            return con.execute(sql + " ORDER BY id LIMIT ?", params + (limit,)).fetchall()
+
+
+class EnqueueResult:
+    def __init__(self, queued: int, duplicates: int, invalid: list):
+        self.queued = queued
+        self.duplicates = duplicates
+        self.invalid = invalid
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, float) and value != value) or not str(value).strip()
+
+
+def render_reminders(rows, sender: str, subject: str, template: str, **fields):
+    """Render `template` for each roster row into outbox message dicts."""
+    return [{
+        "registration_id": row["registration_id"],
+        "full_name": row["full_name"],
+        "sender": sender,
+        "recipient": row["email"],
+        "subject": subject,
+        "body": template.format(full_name=row["full_name"], teaching_hours=row["teaching_hours"], **fields),
+    } for _, row in rows.iterrows()]
+
+
+# ---------------------------
+# Background delivery worker
+# ---------------------------
+# One worker thread per server process drains the outbox. SMTP settings are
+# kept per sender address, so each message goes out under the login of the
+# user who queued it; messages whose sender has no settings in this process
+# (e.g. after a restart) wait until that user sends or retries again.
+# Credentials only live in memory here; they are never written to the outbox.
+
+class OutboxWorker(threading.Thread):
+    def __init__(self, outbox: Outbox):
+        super().__init__(name="outbox-worker", daemon=True)
+        self.outbox = outbox
+        self._senders = {}
+        self._senders_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def configure(self, sender: str, **dispatcher_kwargs):
+        with self._senders_lock:
+            self._senders[sender] = dispatcher_kwargs
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        self.outbox.requeue_interrupted()
+        while not self._stop_event.is_set():
+            with self._senders_lock:
+                senders = dict(self._senders)
+            batch = self.outbox.claim(senders)
+            if not batch:
+                self._stop_event.wait(POLL_INTERVAL)
+                continue
+            for sender in {m["sender"] for m in batch}:
+                self.deliver([m for m in batch if m["sender"] == sender], senders[sender])
+
+    def deliver(self, batch, dispatcher_kwargs: dict):
+        start = time.perf_counter()
+        dispatcher = MailDispatcher(**dispatcher_kwargs)
+        by_id = {m["id"]: m for m in batch}
+        jobs = [(m["id"], build_message(m["sender"], m["recipient"], m["subject"], m["body"])) for m in batch]
+        for message_id, error in dispatcher.send(jobs):
+            if error is None:
+                self.outbox.mark_sent(message_id)
+            else:
+                self.outbox.mark_failed(message_id, by_id[message_id]["attempts"], str(error))
+        record_event("outbox worker", "smtp", time.perf_counter() - start, rows=len(batch),
+                     nbytes=sum(len(m["body"]) for m in batch))
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def ensure_worker(outbox: Outbox, sender: str, **dispatcher_kwargs) -> OutboxWorker:
+    """Start the process-wide worker if needed and register `sender`'s SMTP settings."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(outbox)
+            _worker.start()
+        _worker.configure(sender, **dispatcher_kwargs)
+        return _worker
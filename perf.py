@@ -0,0 +1,207 @@
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# ---------------------------
+# Start-up timing
+# ---------------------------
+# Streamlit re-runs app.py on every interaction, but this module is only
+# imported once per server process, so it is where timings accumulate:
+# how long each lazily imported module took to load the first time, and
+# how long each section took on its first (cold) and latest render.
+
+_lock = threading.Lock()
+_process_start = time.perf_counter()
+_imports = {}
+_renders = {}
+
+
+def lazy_import(name: str):
+    """Import `name` on first use, recording how long the import took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    record_import(name, time.perf_counter() - start)
+    return module
+
+
+def record_import(name: str, seconds: float):
+    with _lock:
+        _imports.setdefault(name, seconds)
+
+
+def record_render(section: str, seconds: float):
+    with _lock:
+        entry = _renders.get(section)
+        if entry is None:
+            _renders[section] = {"first": seconds, "last": seconds, "count": 1}
+        else:
+            entry["last"] = seconds
+            entry["count"] += 1
+
+
+def startup_report() -> dict:
+    with _lock:
+        return {
+            "uptime": time.perf_counter() - _process_start,
+            "imports": dict(_imports),
+            "sections": {name: dict(entry) for name, entry in _renders.items()},
+        }
+
+
+def startup_report_json() -> str:
+    return json.dumps(startup_report(), indent=2)
+
+
+# ---------------------------
+# Per-section phase instrumentation
+# ---------------------------
+# When enabled, each script run records a trace of timed phases (load,
+# compute, chart, render, save) with row counts and payload sizes. Traces
+# are kept in a ring buffer for the admin panel and, if PERF_LOG is set,
+# appended to that file as JSON lines. When disabled, phase() hands back a
+# shared no-op object, so instrumented code pays one attribute lookup.
+
+PERF_LOG = os.environ.get("PERF_LOG")
+MAX_TRACES = 500
+
+_enabled = os.environ.get("APP_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+_traces = deque(maxlen=MAX_TRACES)
+_local = threading.local()
+
+
+def instrumentation_enabled() -> bool:
+    return _enabled
+
+
+def set_instrumentation(value: bool):
+    global _enabled
+    _enabled = bool(value)
+
+
+def payload_size(obj) -> int:
+    """Approximate bytes sent to the browser for a DataFrame, Styler or figure."""
+    if hasattr(obj, "data") and hasattr(obj, "to_html") and not hasattr(obj, "memory_usage"):
+        obj = obj.data  # pandas Styler
+    if hasattr(obj, "memory_usage"):
+        usage = obj.memory_usage(deep=True)  # per column for a DataFrame, a total for a Series
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(obj, "to_json"):
+        return len(obj.to_json())
+    return len(str(obj))
+
+
+class _Span:
+    __slots__ = ("name", "label", "rows", "bytes", "_start")
+
+    def __init__(self, name: str, label, rows):
+        self.name = name
+        self.label = label
+        self.rows = rows
+        self.bytes = None
+
+    def payload(self, obj):
+        self.bytes = (self.bytes or 0) + payload_size(obj)
+        return obj
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        trace = getattr(_local, "trace", None)
+        if trace is not None:
+            trace["phases"].append({"phase": self.name, "label": self.label, "rows": self.rows,
+                                    "bytes": self.bytes, "seconds": time.perf_counter() - self._start})
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def payload(self, obj):
+        return obj
+
+    def __setattr__(self, name, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def begin_trace(section: str):
+    _local.trace = {"section": section, "started_at": time.time(), "phases": [],
+                    "_start": time.perf_counter()} if _enabled else None
+
+
+def phase(name: str, label: str = None, rows=None):
+    """Time a block as `name` (load, compute, chart, render, save) of the current trace."""
+    if getattr(_local, "trace", None) is None:
+        return _NULL_SPAN
+    return _Span(name, label, rows)
+
+
+def end_trace():
+    trace = getattr(_local, "trace", None)
+    _local.trace = None
+    if trace is None:
+        return
+    trace["seconds"] = time.perf_counter() - trace.pop("_start")
+    _store(trace)
+
+
+def record_event(section: str, name: str, seconds: float, rows=None, nbytes=None):
+    """Record a phase timed outside a script run, e.g. by a background worker."""
+    if not _enabled:
+        return
+    _store({"section": section, "started_at": time.time() - seconds, "seconds": seconds,
+            "phases": [{"phase": name, "label": None, "rows": rows, "bytes": nbytes, "seconds": seconds}]})
+
+
+def _store(trace: dict):
+    with _lock:
+        _traces.append(trace)
+        if PERF_LOG:
+            with open(PERF_LOG, "a") as f:
+                f.write(json.dumps(trace) + "\n")
+
+
+def traces() -> list:
+    with _lock:
+        return list(_traces)
+
+
+def traces_jsonl() -> str:
+    return "".join(json.dumps(t) + "\n" for t in traces())
+
+
+def phase_summary() -> list:
+    """One row per (section, phase, label): call count, mean/max time, latest rows and bytes."""
+    stats = {}
+    for trace in traces():
+        for p in trace["phases"]:
+            s = stats.setdefault((trace["section"], p["phase"], p["label"]), {"count": 0, "total": 0.0, "max": 0.0,
+                                                                  "rows": None, "bytes": None})
+            s["count"] += 1
+            s["total"] += p["seconds"]
+            s["max"] = max(s["max"], p["seconds"])
+            if p["rows"] is not None:
+                s["rows"] = p["rows"]
+            if p["bytes"] is not None:
+                s["bytes"] = p["bytes"]
+    return [{"section": section, "phase": name, "label": label, "count": s["count"],
+             "mean_ms": s["total"] / s["count"] * 1000, "max_ms": s["max"] * 1000,
+             "rows": s["rows"], "bytes": s["bytes"]}
+            for (section, name, label), s in stats.items()]
@@ -0,0 +1,86 @@
+import pandas as pd
+
+from schema import EPA_COMPLETED_COLS, EPA_IDS, EPA_TARGETS
+
+# ---------------------------
+# Resident portfolio
+# ---------------------------
+# Streamlit-free building blocks of "4. Resident Portfolio", shared by the
+# app and the batch report generator in reports.py.
+
+TEACHING_TARGET_HOURS = 50
+
+# (section, label, done column, total column)
+PROCEDURES = [
+    ("Ultrasound Scans", "Sonography in Trauma", "ultrasound_trauma_done", "ultrasound_trauma_total"),
+    ("Ultrasound Scans", "Cardiac Ultrasound", "ultrasound_cardiac_done", "ultrasound_cardiac_total"),
+    ("Ultrasound Scans", "Lung Ultrasound", "ultrasound_lung_done", "ultrasound_lung_total"),
+    ("Compulsory Procedures", "Adult Medical Resuscitation", "adult_med_done", "adult_med_total"),
+    ("Compulsory Procedures", "Adult Trauma Resuscitation", "adult_trauma_done", "adult_trauma_total"),
+    ("Compulsory Procedures", "ED Bedside Ultrasound", "ed_ultrasound_done", "ed_ultrasound_total"),
+]
+
+ASSESSMENTS = [
+    ("MMed (EM) Part A", "MMed_A_Status"),
+    ("MMed (EM) Part B", "MMed_B_Status"),
+    ("MMed (EM) Part C", "MMed_C_Status"),
+    ("Teaching and Administration Portfolio", "Teaching_Admin_Status"),
+    ("Clinical Viva (9 stations)", "Clinical_Viva_Status"),
+    ("CAT (2 hr written paper)", "CAT_Status"),
+    ("ABMS MCQ Exam (200 MCQ, 6h 10min)", "ABMS_MCQs_Status"),
+]
+
+
+def fraction(done, total) -> float:
+    """Progress-bar fraction clamped to [0, 1]; 1.0 when nothing is required."""
+    try:
+        done, total = float(done), float(total)
+    except (TypeError, ValueError):
+        return 0.0
+    if pd.isna(done) or pd.isna(total):
+        return 0.0
+    if total <= 0:
+        return 1.0
+    return min(max(done / total, 0.0), 1.0)
+
+
+def teaching_progress(row: pd.Series) -> dict:
+    hours = row["teaching_hours"]
+    return {"hours": hours, "target": TEACHING_TARGET_HOURS, "fraction": fraction(hours, TEACHING_TARGET_HOURS)}
+
+
+def procedure_progress(row: pd.Series) -> list:
+    return [{"section": section, "label": label, "done": row[done], "total": row[total],
+             "fraction": fraction(row[done], row[total])}
+            for section, label, done, total in PROCEDURES]
+
+
+def assessments_table(row: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame([[name, row[col]] for name, col in ASSESSMENTS], columns=["Assessment", "Status"])
+
+
+def epa_milestones(row: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame({
+        "EPA ID": EPA_IDS,
+        "Current Level": [row[col] for col in EPA_IDS],
+        "Target Level": [EPA_TARGETS[col] for col in EPA_IDS],
+        "Completed": [row[col] for col in EPA_COMPLETED_COLS],
+    })
+
+
+# Highlight Fail and Pending with nude colors
+def highlight_status(val):
+    if val == 'Fail':
+        return 'background-color: #F5B7B1'  # soft nude red
+    elif val == 'Pending':
+        return 'background-color: #FFF3C4'  # soft nude yellow
+    else:
+        return ''
+
+
+# Highlight not completed in light orange
+def highlight_not_completed(val):
+    if val != "Yes":
+        return 'background-color: #FFF3C4'  # light orange
+    else:
+        return ''
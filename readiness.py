@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from schema import ENTRUSTMENT_LEVELS, EPA_IDS, EPA_TARGETS
+
+# ---------------------------
+# EPA readiness
+# ---------------------------
+# Compares every resident's current entrustment level against EPA_TARGETS
+# in one array operation over the typed roster's ordinal level codes.
+
+TARGET_CODES = np.array([ENTRUSTMENT_LEVELS.index(EPA_TARGETS[epa]) for epa in EPA_IDS], dtype=np.int8)
+
+
+def level_matrix(typed: pd.DataFrame) -> np.ndarray:
+    return typed[EPA_IDS].to_numpy(dtype=np.int8)
+
+
+def readiness_matrix(typed: pd.DataFrame) -> pd.DataFrame:
+    """Boolean residents x EPAs frame: True where the target level is met."""
+    met = level_matrix(typed) >= TARGET_CODES
+    return pd.DataFrame(met, index=typed["registration_id"].to_numpy(), columns=EPA_IDS)
+
+
+def readiness_summary(typed: pd.DataFrame) -> pd.DataFrame:
+    """One row per resident with their gap count and overall readiness."""
+    met = level_matrix(typed) >= TARGET_CODES
+    gaps = (~met).sum(axis=1)
+    return pd.DataFrame({
+        "registration_id": typed["registration_id"].to_numpy(),
+        "full_name": typed["full_name"].to_numpy(),
+        "year": typed["year"].to_numpy(),
+        "sponsoring_institution": typed["sponsoring_institution"].to_numpy(),
+        "gaps": gaps,
+        "ready": gaps == 0,
+    })
+
+
+def below_target(typed: pd.DataFrame, epa: str = None) -> pd.DataFrame:
+    """Residents below target in `epa`, or in any EPA if `epa` is None."""
+    met = level_matrix(typed) >= TARGET_CODES
+    mask = ~met[:, EPA_IDS.index(epa)] if epa else ~met.all(axis=1)
+    return typed[mask]
+
+
+def epa_attainment(typed: pd.DataFrame) -> pd.Series:
+    """Share of residents meeting target, per EPA."""
+    if typed.empty:
+        return pd.Series(0.0, index=EPA_IDS)
+    return pd.Series((level_matrix(typed) >= TARGET_CODES).mean(axis=0), index=EPA_IDS)
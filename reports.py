@@ -0,0 +1,161 @@
+import html
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from portfolio import (TEACHING_TARGET_HOURS, PROCEDURES, assessments_table, epa_milestones, fraction,
+                       highlight_not_completed, highlight_status, procedure_progress, teaching_progress)
+from readiness import readiness_summary
+from schema import STATUS_COLS, typed_roster
+
+# ---------------------------
+# Batch portfolio reports
+# ---------------------------
+# Renders every resident's portfolio, as shown on "4. Resident Portfolio",
+# to static HTML without Streamlit, plus a cohort summary as CSV and HTML.
+# Residents are split into chunks rendered in parallel by a process pool.
+
+PAGE_STYLE = """
+body { font-family: sans-serif; margin: 2em; max-width: 60em; }
+.bar { background: #eee; border-radius: 4px; height: 0.8em; width: 100%; }
+.bar > div { background: #4a90d9; border-radius: 4px; height: 100%; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+th, td { border: 1px solid #ddd; padding: 4px 8px; text-align: left; }
+"""
+
+
+def _page(title: str, body: str) -> str:
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+            f"<style>{PAGE_STYLE}</style></head><body>{body}</body></html>")
+
+
+def _bar(frac: float) -> str:
+    return f"<div class='bar'><div style='width:{frac * 100:.0f}%'></div></div>"
+
+
+def _table(df: pd.DataFrame, styled_col: str = None, style=None, link_col: str = None, hrefs=None) -> str:
+    # Plain string building; Styler.to_html is too slow to run per resident.
+    # Every cell is escaped; link_col's cells are wrapped in links to hrefs
+    head = "".join(f"<th>{html.escape(str(c))}</th>" for c in df.columns)
+    rows = []
+    for i, values in enumerate(df.itertuples(index=False)):
+        cells = []
+        for col, val in zip(df.columns, values):
+            css = style(val) if col == styled_col else ""
+            attr = f" style='{css}'" if css else ""
+            text = html.escape(str(val))
+            if col == link_col:
+                text = f"<a href='{html.escape(hrefs[i])}'>{text}</a>"
+            cells.append(f"<td{attr}>{text}</td>")
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(rows)}</tbody></table>"
+
+
+def render_portfolio(row: pd.Series) -> str:
+    name = html.escape(str(row["full_name"]))
+    parts = [f"<h1>{name} Portfolio Overview</h1>",
+             f"<p>{html.escape(str(row['registration_id']))} · Year {html.escape(str(row['year']))} · "
+             f"{html.escape(str(row['sponsoring_institution']))}</p>"]
+
+    teaching = teaching_progress(row)
+    parts += ["<h3>Teaching Progress</h3>", _bar(teaching["fraction"]),
+              f"<p>{teaching['hours']} Hours / Target: {teaching['target']} hours/year</p>"]
+
+    section = None
+    for item in procedure_progress(row):
+        if item["section"] != section:
+            section = item["section"]
+            parts.append(f"<h3>{section}</h3>")
+        parts += [f"<p><b>{item['label']}</b></p>", _bar(item["fraction"]),
+                  f"<p>{item['done']}/{item['total']}</p>"]
+
+    parts.append("<h3>Summative Assessments (Pass M.Med or Equivalent)</h3>")
+    parts.append(_table(assessments_table(row), "Status", highlight_status))
+    parts.append("<h3>EPA Milestone Tracking</h3>")
+    parts.append(_table(epa_milestones(row), "Completed", highlight_not_completed))
+    return _page(f"{row['full_name']} Portfolio", "".join(parts))
+
+
+def _filenames(registration_ids) -> list:
+    """One portfolio file name per resident. IDs that sanitise to the same
+    name ("A/1" and "A_1", or differ only in case) get -2, -3... suffixes."""
+    used, names = {"index.html"}, []
+    for rid in registration_ids:
+        stem = re.sub(r"[^A-Za-z0-9_.-]", "_", str(rid))
+        name, n = f"{stem}.html", 1
+        while name.lower() in used:
+            n += 1
+            name = f"{stem}-{n}.html"
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+def _render_chunk(args) -> int:
+    chunk, names, out_dir = args
+    for (_, row), name in zip(chunk.iterrows(), names):
+        with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+            f.write(render_portfolio(row))
+    return len(chunk)
+
+
+def cohort_summary(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per resident: teaching and procedure progress, assessments, EPA gaps."""
+    summary = readiness_summary(typed_roster(df)).rename(columns={"gaps": "epas_below_target"})
+    hours = pd.to_numeric(df["teaching_hours"], errors="coerce").to_numpy()
+    summary.insert(4, "teaching_hours", hours)
+    summary.insert(5, "teaching_progress", np.clip(np.nan_to_num(hours) / TEACHING_TARGET_HOURS, 0, 1).round(2))
+    for _, label, done, total in PROCEDURES:
+        summary[label] = [round(fraction(d, t), 2) for d, t in zip(df[done], df[total])]
+    for col in STATUS_COLS:
+        summary[col] = df[col].to_numpy()
+    summary["report"] = _filenames(df["registration_id"])
+    return summary
+
+
+def generate_reports(df: pd.DataFrame, out_dir: str, workers: int = None, chunk_size: int = 200) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    names = _filenames(df["registration_id"])
+    chunks = [(df.iloc[i:i + chunk_size], names[i:i + chunk_size], out_dir) for i in range(0, len(df), chunk_size)]
+    if workers == 1:
+        n = sum(map(_render_chunk, chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            n = sum(pool.map(_render_chunk, chunks))
+
+    summary = cohort_summary(df)
+    summary.to_csv(os.path.join(out_dir, "cohort_summary.csv"), index=False)
+    table = _table(summary.drop(columns=["report"]), link_col="full_name", hrefs=summary["report"].tolist())
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(_page("Cohort Summary", "<h1>Cohort Summary</h1>" + table))
+    return n
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from logbook import add_logged, get_logbook
+    from storage import load_doctors
+
+    parser = argparse.ArgumentParser(description="Render every resident's portfolio and a cohort summary")
+    parser.add_argument("--out", default="reports", help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--institution", help="Only residents from this sponsoring institution")
+    parser.add_argument("--year", type=int, help="Only residents in this year")
+    args = parser.parse_args()
+
+    roster = load_doctors()
+    logged = get_logbook().totals_frame()
+    roster = add_logged(roster, logged)
+    if args.institution:
+        roster = roster[roster["sponsoring_institution"] == args.institution]
+    if args.year:
+        roster = roster[roster["year"] == args.year]
+
+    start = time.perf_counter()
+    n = generate_reports(roster.reset_index(drop=True), args.out, args.workers)
+    print(f"Wrote {n} portfolios and cohort summary to {args.out}/ in {time.perf_counter() - start:.1f}s")
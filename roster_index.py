@@ -0,0 +1,50 @@
+import pandas as pd
+
+# ---------------------------
+# Resident lookup index
+# ---------------------------
+# Built once per roster version. Maps registration_id to the resident's row
+# position for O(1) access, and full_name to registration_ids so residents
+# who share a name can still be told apart in the selectboxes.
+
+
+class RosterIndex:
+    def __init__(self, df: pd.DataFrame):
+        ids = df["registration_id"].tolist() if "registration_id" in df else []
+        names = df["full_name"].tolist() if "full_name" in df else []
+        # Keep the first row for a duplicated ID, matching boolean-mask .iloc[0]
+        self._positions = {}
+        for pos, rid in enumerate(ids):
+            self._positions.setdefault(rid, pos)
+        self._names = {}
+        for rid, name in zip(ids, names):
+            self._names.setdefault(rid, name)
+        self._by_name = {}
+        for rid, name in zip(ids, names):
+            self._by_name.setdefault(name, []).append(rid)
+        self.ids = list(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, registration_id) -> bool:
+        return registration_id in self._positions
+
+    def position(self, registration_id):
+        return self._positions.get(registration_id)
+
+    def ids_for_name(self, full_name: str) -> list:
+        return self._by_name.get(full_name, [])
+
+    def name(self, registration_id) -> str:
+        return self._names.get(registration_id, "")
+
+    def label(self, registration_id) -> str:
+        """Selectbox label: the name, with the ID added when the name is shared."""
+        name = self.name(registration_id)
+        if len(self._by_name.get(name, [])) > 1:
+            return f"{name} ({registration_id})"
+        return str(name)
+
+    def row(self, df: pd.DataFrame, registration_id) -> pd.Series:
+        return df.iloc[self._positions[registration_id]]
@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from schema import EPA_COMPLETED_COLS, EPA_IDS, PROCEDURE_COLS, STATUS_COLS
+
+# ---------------------------
+# Paginated roster grid
+# ---------------------------
+# Filtering runs server-side on the typed roster; only the requested page
+# and column groups are sliced out of the raw roster and sent to the
+# browser, so the payload is bounded by page size, not roster size.
+
+COLUMN_GROUPS = {
+    "Basic": ["full_name", "registration_id", "year", "sponsoring_institution", "email", "phone"],
+    "Profile": ["age", "gender", "nationality", "medical_school", "created_at"],
+    "Rotations & Teaching": ["rotations", "teaching_hours"],
+    "Procedures": PROCEDURE_COLS,
+    "Assessments": STATUS_COLS,
+    "EPA Levels": EPA_IDS,
+    "EPA Completion": EPA_COMPLETED_COLS,
+}
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def filter_mask(typed: pd.DataFrame, name: str = "", institutions=None, years=None,
+                status_col: str = None, statuses=None) -> np.ndarray:
+    """Boolean mask over the roster rows matching every given filter."""
+    mask = np.ones(len(typed), dtype=bool)
+    if name:
+        mask &= typed["full_name"].astype(str).str.contains(name, case=False, regex=False).to_numpy()
+    if institutions:
+        mask &= typed["sponsoring_institution"].isin(institutions).to_numpy()
+    if years:
+        mask &= typed["year"].isin(years).to_numpy(dtype=bool, na_value=False)
+    if status_col and statuses:
+        mask &= typed[status_col].isin(statuses).to_numpy()
+    return mask
+
+
+def project_columns(groups) -> list:
+    columns = []
+    for group in groups or ["Basic"]:
+        columns += [c for c in COLUMN_GROUPS[group] if c not in columns]
+    return columns
+
+
+def page_count(n_rows: int, page_size: int) -> int:
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def roster_page(df: pd.DataFrame, mask: np.ndarray, page: int, page_size: int, columns: list) -> pd.DataFrame:
+    """Rows of page `page` (1-based) among the rows selected by `mask`."""
+    positions = np.flatnonzero(mask)[(page - 1) * page_size: page * page_size]
+    view = df.iloc[positions][[c for c in columns if c in df.columns]].copy()
+    if "phone" in view:
+        view["phone"] = view["phone"].astype(str).str.replace(",", "", regex=False)
+    return view
@@ -0,0 +1,51 @@
+import pandas as pd
+
+# ---------------------------
+# Normalised rotations
+# ---------------------------
+# The roster stores each resident's rotations as one semicolon-joined
+# string ("Trauma;Cardiac;ED"). For counting and filtering they are
+# exploded once per roster version into a long table with one row per
+# (resident, rotation), so every query below is a vectorised groupby
+# rather than a per-row string split.
+
+
+def split_rotations(values: pd.Series) -> pd.Series:
+    """Explode semicolon-joined rotation strings into one entry per rotation.
+
+    The result keeps the index of `values`, repeated once per rotation.
+    """
+    parts = values.dropna().astype(str).str.split(";").explode().str.strip()
+    return parts[parts.notna() & (parts != "")]
+
+
+def join_rotations(value) -> str:
+    """Normalise a list or a semicolon-separated string to the stored format."""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    items = value if isinstance(value, (list, tuple)) else str(value).split(";")
+    return ";".join(str(r).strip() for r in items if str(r).strip())
+
+
+def build_rotations_table(df: pd.DataFrame) -> pd.DataFrame:
+    if "rotations" not in df.columns or df.empty:
+        return pd.DataFrame({
+            "registration_id": pd.Series(dtype=object),
+            "sponsoring_institution": pd.Series(dtype="category"),
+            "rotation": pd.Series(dtype="category"),
+        })
+    parts = split_rotations(df["rotations"])
+    rows = df.loc[parts.index]
+    return pd.DataFrame({
+        "registration_id": rows["registration_id"].to_numpy(),
+        "sponsoring_institution": pd.Categorical(rows["sponsoring_institution"].to_numpy()),
+        "rotation": pd.Categorical(parts.to_numpy()),
+    })
+
+
+def residents_in_rotation(table: pd.DataFrame, rotation: str) -> pd.Index:
+    return pd.Index(table.loc[table["rotation"] == rotation, "registration_id"].unique())
+
+
+def rotation_by_institution(table: pd.DataFrame) -> pd.DataFrame:
+    return pd.crosstab(table["rotation"], table["sponsoring_institution"])
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------
+# Roster schema
+# ---------------------------
+# The roster is stored as text, so a plain read gives object columns of
+# "Pass"/"Fail"/"Pending", "Yes"/"No" and EPA levels that mix ints from
+# default.csv with "3a"/"4b" strings from the Update EPA page. typed_roster()
+# converts it to compact, comparable dtypes for filtering and analysis.
+
+STATUS_VALUES = ["Pass", "Fail", "Pending"]
+STATUS_COLS = ["MMed_A_Status", "MMed_B_Status", "MMed_C_Status", "Teaching_Admin_Status",
+               "Clinical_Viva_Status", "CAT_Status", "ABMS_MCQs_Status"]
+
+EPA_IDS = [f"EPA{i}" for i in range(1, 9)]
+EPA_COMPLETED_COLS = [f"{epa}_Completed" for epa in EPA_IDS]
+
+# Entrustment levels in ascending order; a level's position is its ordinal code
+ENTRUSTMENT_LEVELS = ["1", "2", "2a", "2b", "3", "3a", "3b", "3c", "4", "4a", "4b", "5"]
+UNKNOWN_LEVEL = -1
+
+# Entrustment level required in each EPA to exit the programme
+EPA_TARGETS = {"EPA1": "4b", "EPA2": "4b", "EPA3": "3a", "EPA4": "4b",
+               "EPA5": "3b", "EPA6": "4b", "EPA7": "4b", "EPA8": "4b"}
+
+PROCEDURE_COLS = ["ultrasound_trauma_done", "ultrasound_trauma_total",
+                  "ultrasound_cardiac_done", "ultrasound_cardiac_total",
+                  "ultrasound_lung_done", "ultrasound_lung_total",
+                  "adult_med_done", "adult_med_total",
+                  "adult_trauma_done", "adult_trauma_total",
+                  "ed_ultrasound_done", "ed_ultrasound_total"]
+
+SPONSORING_INSTITUTIONS = ["SingHealth", "NHG", "NUHS"]
+
+# Requirement totals the Add Doctor form starts from
+PROCEDURE_DEFAULT_TOTALS = {"ultrasound_trauma_total": 25, "ultrasound_cardiac_total": 25,
+                            "ultrasound_lung_total": 25, "adult_med_total": 45,
+                            "adult_trauma_total": 35, "ed_ultrasound_total": 165}
+
+CATEGORY_COLS = ["gender", "nationality", "medical_school", "sponsoring_institution"]
+
+_LEVEL_CODES = {level: code for code, level in enumerate(ENTRUSTMENT_LEVELS)}
+
+
+def level_codes(values: pd.Series) -> pd.Series:
+    """Map entrustment levels (3, "3", "3a", 3.0 ...) to int8 ordinal codes.
+
+    Unknown or missing levels become UNKNOWN_LEVEL.
+    """
+    text = values.astype(object).where(values.notna(), "").astype(str).str.strip()
+    # Whole-number levels read from CSV may arrive as floats ("3.0")
+    text = text.str.replace(r"^(\d+)\.0$", r"\1", regex=True)
+    return text.map(_LEVEL_CODES).fillna(UNKNOWN_LEVEL).astype(np.int8)
+
+
+def _unsigned(values: pd.Series, dtype: str) -> pd.Series:
+    """Whole numbers as a nullable unsigned dtype; a column holding any
+    fractional, negative or too large value stays float32 instead."""
+    numeric = pd.to_numeric(values, errors="coerce")
+    present = numeric.dropna()
+    limit = np.iinfo(dtype.lower()).max
+    if ((present % 1 == 0) & (present >= 0) & (present <= limit)).all():
+        return numeric.astype(dtype)
+    return numeric.astype(np.float32)
+
+
+def typed_roster(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.copy()
+    for col in STATUS_COLS:
+        if col in out:
+            out[col] = pd.Categorical(out[col], categories=STATUS_VALUES)
+    for col in CATEGORY_COLS:
+        if col in out:
+            out[col] = out[col].astype("category")
+    for col in EPA_COMPLETED_COLS:
+        if col in out:
+            out[col] = out[col].eq("Yes")
+    for col in EPA_IDS:
+        if col in out:
+            out[col] = level_codes(out[col])
+    for col in PROCEDURE_COLS:
+        if col in out:
+            out[col] = _unsigned(out[col], "UInt16")
+    if "age" in out:
+        out["age"] = _unsigned(out["age"], "UInt8")
+    if "year" in out:
+        out["year"] = _unsigned(out["year"], "UInt8")
+    if "teaching_hours" in out:
+        out["teaching_hours"] = pd.to_numeric(out["teaching_hours"], errors="coerce").astype(np.float32)
+    return out
+
+
+def memory_report(raw: pd.DataFrame, typed: pd.DataFrame) -> dict:
+    before = int(raw.memory_usage(deep=True).sum())
+    after = int(typed.memory_usage(deep=True).sum())
+    return {"rows": len(raw), "raw_bytes": before, "typed_bytes": after,
+            "reduction": 1 - after / before if before else 0.0}
@@ -0,0 +1,723 @@
+import contextlib
+import csv
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from aggregates import DashboardAggregates
+from roster_index import RosterIndex
+from rotations import build_rotations_table
+from schema import memory_report, typed_roster
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+# ---------------------------
+# CSV file storage
+# ---------------------------
+
+CSV_FILE = "default.csv"
+
+# Column layout of the roster, in the order default.csv stores it
+COLUMNS = ["full_name","age","gender","nationality","medical_school","registration_id",
+           "email","phone","year","rotations","teaching_hours","created_at","sponsoring_institution",
+           "ultrasound_trauma_done","ultrasound_trauma_total",
+           "ultrasound_cardiac_done","ultrasound_cardiac_total",
+           "ultrasound_lung_done","ultrasound_lung_total",
+           "adult_med_done","adult_med_total",
+           "adult_trauma_done","adult_trauma_total",
+           "ed_ultrasound_done","ed_ultrasound_total",
+           "MMed_A_Status","MMed_B_Status","MMed_C_Status","Teaching_Admin_Status",
+           "Clinical_Viva_Status","CAT_Status","ABMS_MCQs_Status",
+           "EPA1","EPA2","EPA3","EPA4","EPA5","EPA6","EPA7","EPA8",
+           "EPA1_Completed","EPA2_Completed","EPA3_Completed","EPA4_Completed",
+           "EPA5_Completed","EPA6_Completed","EPA7_Completed","EPA8_Completed",
+           "row_version"]
+
+# Identifiers that look numeric but must keep leading zeros and "+" signs
+TEXT_DTYPES = {"registration_id": str, "phone": str}
+
+
+# ---------------------------
+# Roster cache
+# ---------------------------
+# Streamlit re-runs app.py on every widget interaction, but imported modules
+# stay loaded for the life of the server process, so the parsed roster is
+# kept here and only re-read when the file's mtime/size changes.
+
+class RosterCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._df = None
+        self._derived = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return a copy of the cached roster for `key`, or None if stale."""
+        with self._lock:
+            if key is not None and key == self._key:
+                self.hits += 1
+                return self._df.copy()
+            self.misses += 1
+            return None
+
+    def peek(self, key):
+        """Like get(), but the cached frame itself rather than a copy, for
+        lookups that only read a row or two. Callers must not modify it."""
+        with self._lock:
+            if key is not None and key == self._key:
+                self.hits += 1
+                return self._df
+            self.misses += 1
+            return None
+
+    def put(self, key, df: pd.DataFrame):
+        with self._lock:
+            self._key = key
+            self._df = df.copy()
+            self._df.attrs["roster_key"] = key
+            self._derived = {}
+
+    def extend(self, old_key, new_key, rows: pd.DataFrame):
+        """Append `rows` to the cached roster if it was current at `old_key`."""
+        with self._lock:
+            self._derived = {}
+            if old_key is None or old_key != self._key:
+                self._key = None
+                self._df = None
+                return
+            self._df = pd.concat([self._df, rows], ignore_index=True)
+            self._df.attrs["roster_key"] = new_key
+            self._key = new_key
+
+    def invalidate(self):
+        with self._lock:
+            self._key = None
+            self._df = None
+            self._derived = {}
+
+    def derived(self, name: str, build, df: pd.DataFrame):
+        """Return `build(df)`, computed once per roster version. Copies of the
+        cached roster carry its version in attrs; any other frame (an older
+        or newer version, or one built elsewhere) is built from directly."""
+        key = df.attrs.get("roster_key")
+        with self._lock:
+            current = key is not None and key == self._key and len(df) == len(self._df)
+            if not current:
+                return build(df)
+            hit = self._derived.get(name)
+            if hit is not None and hit[0] == key:
+                return hit[1]
+            df = self._df
+        value = build(df)
+        with self._lock:
+            if self._key == key:
+                self._derived[name] = (key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+def _file_key(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+
+# ---------------------------
+# Concurrency
+# ---------------------------
+# Several sessions may save at once. Every read-modify-write runs under an
+# exclusive lock, files are replaced atomically (temp file + rename) so
+# readers never see a half-written roster, and each row carries a
+# row_version stamp that is bumped on every change. A save built from a
+# stale copy only writes the rows it changed; rows someone else changed in
+# the meantime are left alone and reported as a ConflictError.
+
+class ConflictError(Exception):
+    def __init__(self, registration_ids):
+        self.registration_ids = list(registration_ids)
+        super().__init__("Changed by another user since loaded: " + ", ".join(map(str, self.registration_ids)))
+
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+@contextlib.contextmanager
+def _locked(path: str):
+    lock_path = os.path.abspath(path) + ".lock"
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(lock_path, threading.Lock())
+    with thread_lock, open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _atomic_write_csv(df: pd.DataFrame, path: str):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _versions(df: pd.DataFrame) -> np.ndarray:
+    if "row_version" not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    return pd.to_numeric(df["row_version"], errors="coerce").fillna(0).astype(np.int64).to_numpy()
+
+
+def _match(current: pd.DataFrame, incoming: pd.DataFrame):
+    """Match `incoming` rows to `current` on registration_id.
+
+    Returns a mask of incoming rows found in `current`, their positions in
+    `current`, and whether each found row differs from its match.
+    """
+    positions = pd.Series(np.arange(len(current)), index=current["registration_id"])
+    positions = positions[~positions.index.duplicated(keep="last")]
+    found = incoming["registration_id"].isin(positions.index).to_numpy()
+    matched = incoming[found]
+    pos = positions.loc[matched["registration_id"]].to_numpy()
+    base = current.iloc[pos]
+    cols = [c for c in incoming.columns if c in current.columns and c != "row_version"]
+    differs = (_normalise(matched[cols]) != _normalise(base[cols])).any(axis=1)
+    return found, pos, differs
+
+
+def _edited(base: pd.DataFrame, df: pd.DataFrame) -> pd.DataFrame:
+    """Rows of `df` that are new or differ from the `base` they were loaded as."""
+    if base.empty:
+        return df
+    found, _, differs = _match(base, df)
+    keep = ~found
+    keep[found] = differs
+    return df[keep]
+
+
+def _merge(current: pd.DataFrame, incoming: pd.DataFrame):
+    """Split `incoming` into rows to write and rows that conflict.
+
+    Returns (changed, new, conflicts): incoming rows that differ from their
+    current row, with row_version bumped and indexed by that row's position
+    in `current`; incoming rows with no current match; and registration_ids
+    whose current row has moved on since the incoming copy was loaded.
+    """
+    if current.empty:
+        return incoming.iloc[:0], incoming, []
+    found, pos, differs = _match(current, incoming)
+    matched = incoming[found]
+    base_ver = _versions(current.iloc[pos])
+    stale = _versions(matched) != base_ver
+
+    changed = matched[differs & ~stale].copy()
+    changed["row_version"] = base_ver[differs & ~stale] + 1
+    changed.index = pos[differs & ~stale]
+    conflicts = matched.loc[differs & stale, "registration_id"].tolist()
+    return changed, incoming[~found], conflicts
+
+
+def _normalise(df: pd.DataFrame) -> np.ndarray:
+    # Values round-trip through CSV/SQLite as strings, ints or floats, so
+    # compare their text form
+    return df.astype(object).where(df.notna(), "").astype(str).to_numpy()
+
+
+# ---------------------------
+# Storage backends
+# ---------------------------
+# Both backends expose the same load/save/append/update/get interface; the
+# module-level functions below dispatch to whichever one ROSTER_BACKEND
+# selects ("csv" by default, or "sqlite" with the database at ROSTER_DB).
+
+class _CachedBackend:
+    """Lookups both backends serve from their cached roster."""
+
+    def _cached(self) -> pd.DataFrame:
+        # Read-only: the cached frame without load()'s defensive copy
+        df = self.cache.peek(_file_key(self.path))
+        return df if df is not None else self.load()
+
+    def index(self, df: pd.DataFrame = None) -> RosterIndex:
+        """Lookup index for the current roster, built once per roster version."""
+        return self.cache.derived("index", RosterIndex, self._cached() if df is None else df)
+
+
+class CsvBackend(_CachedBackend):
+    def __init__(self, path: str = CSV_FILE):
+        self.path = path
+        self.aggregates_path = path + ".aggregates.json"
+        self.cache = RosterCache()
+
+    def load(self) -> pd.DataFrame:
+        # Stat before parsing so a write landing mid-read leaves a stale key
+        # behind rather than caching old rows under the new file's key
+        key = _file_key(self.path)
+        df = self.cache.get(key)
+        if df is not None:
+            return df
+        try:
+            df = pd.read_csv(self.path, dtype=TEXT_DTYPES)
+        except FileNotFoundError:
+            return pd.DataFrame(columns=COLUMNS)
+        if key is not None:
+            self.cache.put(key, df)
+            df.attrs["roster_key"] = key
+        return df
+
+    def save(self, df: pd.DataFrame, base: pd.DataFrame = None):
+        if base is not None:
+            df = _edited(base, df)
+        with _locked(self.path):
+            key_before = _file_key(self.path)
+            current = self.load()
+            changed, new, conflicts = _merge(current, df)
+            if not changed.empty or not new.empty:
+                out = current.astype(object)
+                if "row_version" not in out.columns:
+                    out["row_version"] = 0
+                changed = changed.reindex(columns=out.columns)
+                changed.index = out.index[changed.index]
+                removed = out.loc[changed.index].copy()
+                out.loc[changed.index] = changed
+                out = pd.concat([out, new.reindex(columns=out.columns)], ignore_index=True)
+                out["row_version"] = _versions(out)
+                self.cache.invalidate()
+                _atomic_write_csv(out, self.path)
+                self._store_aggregates(key_before, removed, pd.concat([changed, new]))
+        if conflicts:
+            raise ConflictError(conflicts)
+
+    def replace(self, df: pd.DataFrame):
+        with _locked(self.path):
+            self.cache.invalidate()
+            _atomic_write_csv(df, self.path)
+            self._store_aggregates(None, None, None)
+
+    # Append a single doctor without rewriting the rest of the file
+    def append(self, row: dict):
+        with _locked(self.path):
+            header = _read_header(self.path)
+            if header is None:
+                self.cache.invalidate()
+                _atomic_write_csv(pd.DataFrame([row]).reindex(columns=COLUMNS), self.path)
+                self._store_aggregates(None, None, None)
+                return
+
+            new_row = pd.DataFrame([row]).reindex(columns=header)
+            old_key = _file_key(self.path)
+            with open(self.path, "rb+") as f:
+                # Files saved by hand may lack a trailing newline
+                f.seek(0, os.SEEK_END)
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")
+                f.write(new_row.to_csv(header=False, index=False).encode())
+            # Round-trip the row through read_csv so the cached frame holds
+            # the same value types a fresh load would produce
+            parsed = pd.read_csv(io.StringIO(new_row.to_csv(index=False)), dtype=TEXT_DTYPES)
+            self.cache.extend(old_key, _file_key(self.path), parsed)
+            self._store_aggregates(old_key, None, parsed)
+
+    def append_many(self, chunks) -> int:
+        """Append an iterable of DataFrame chunks in one locked write."""
+        n = 0
+        with _locked(self.path):
+            header = _read_header(self.path)
+            key_before = _file_key(self.path) if header is not None else None
+            batch = DashboardAggregates()
+            self.cache.invalidate()
+            with open(self.path, "a+b") as f:
+                if header is None:
+                    header = COLUMNS
+                    f.write(pd.DataFrame(columns=header).to_csv(index=False).encode())
+                else:
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() > 0:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            f.write(b"\n")
+                for chunk in chunks:
+                    f.write(chunk.reindex(columns=header).to_csv(header=False, index=False).encode())
+                    batch.apply(None, chunk)
+                    n += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            self._store_aggregates(key_before, None, None, batch)
+        return n
+
+    def update(self, registration_id: str, values: dict, expected_version=None):
+        with _locked(self.path):
+            key_before = _file_key(self.path)
+            df = self.load()
+            pos = self.index(df).position(registration_id)
+            if pos is None:
+                raise KeyError(registration_id)
+            removed = df.iloc[[pos]].copy()
+            version = int(_versions(removed)[0])
+            if expected_version is not None and int(expected_version) != version:
+                raise ConflictError([registration_id])
+
+            values = dict(values, row_version=version + 1)
+            cols = list(values)
+            for col in cols:
+                if col not in df.columns:
+                    df[col] = None
+            df = df.astype({c: object for c in cols if df[c].dtype != object})
+            df.iloc[pos, df.columns.get_indexer(cols)] = list(values.values())
+            if df["row_version"].isna().any():
+                df["row_version"] = _versions(df)
+            self.cache.invalidate()
+            _atomic_write_csv(df, self.path)
+            self._store_aggregates(key_before, removed, df.iloc[[pos]])
+
+    def get(self, registration_id: str):
+        df = self._cached()
+        pos = self.index(df).position(registration_id)
+        return None if pos is None else df.iloc[pos].copy()
+
+    # The aggregates sidecar records the roster file key it was computed
+    # from; if the roster changed behind its back (hand edits, a crash
+    # between the two writes) it is rebuilt instead of patched.
+    def aggregates(self) -> DashboardAggregates:
+        agg = self._read_aggregates()
+        key = _file_key(self.path)
+        if agg is not None and key is not None and agg.source_key == list(key):
+            return agg
+        with _locked(self.path):
+            self._store_aggregates(None, None, None)
+            return self._read_aggregates()
+
+    def rebuild_aggregates(self):
+        with _locked(self.path):
+            self._store_aggregates(None, None, None)
+
+    def _read_aggregates(self):
+        try:
+            with open(self.aggregates_path) as f:
+                return DashboardAggregates.from_json(f.read())
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def _store_aggregates(self, key_before, removed, added, batch: DashboardAggregates = None):
+        # Called under the lock, after the roster itself has been written
+        agg = self._read_aggregates()
+        if agg is None or key_before is None or agg.source_key != list(key_before):
+            agg = DashboardAggregates.from_roster(self.load())
+        else:
+            agg.apply(removed, added)
+            if batch is not None:
+                agg.merge(batch)
+        key = _file_key(self.path)
+        agg.source_key = list(key) if key is not None else None
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.aggregates_path)), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(agg.to_json())
+        os.replace(tmp, self.aggregates_path)
+
+
+class SqliteBackend(_CachedBackend):
+    INDEXED = ["registration_id", "full_name", "sponsoring_institution", "year"]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cache = RosterCache()
+        with self._connect() as con:
+            self._create(con)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _create(self, con):
+        cols = ", ".join(_quote(c) for c in COLUMNS)
+        con.execute(f"CREATE TABLE IF NOT EXISTS doctors ({cols})")
+        existing = {r[1] for r in con.execute("PRAGMA table_info(doctors)")}
+        for col in COLUMNS:
+            if col not in existing:
+                con.execute(f"ALTER TABLE doctors ADD COLUMN {_quote(col)}")
+        for col in self.INDEXED:
+            con.execute(f"CREATE INDEX IF NOT EXISTS idx_doctors_{col} ON doctors ({_quote(col)})")
+        con.execute("CREATE TABLE IF NOT EXISTS aggregates (id INTEGER PRIMARY KEY CHECK (id = 1), data TEXT NOT NULL)")
+
+    def load(self) -> pd.DataFrame:
+        key = _file_key(self.path)
+        df = self.cache.get(key)
+        if df is not None:
+            return df
+        with self._connect() as con:
+            df = self._select_all(con)
+        if key is not None:
+            self.cache.put(key, df)
+            df.attrs["roster_key"] = key
+        return df
+
+    def save(self, df: pd.DataFrame, base: pd.DataFrame = None):
+        if base is not None:
+            df = _edited(base, df)
+        self.cache.invalidate()
+        with self._connect() as con:
+            # Take the write lock up front so the rows compared below are the
+            # rows the UPDATEs apply to
+            con.execute("BEGIN IMMEDIATE")
+            current = self._select_all(con)
+            changed, new, conflicts = _merge(current, df)
+            cols = [c for c in changed.columns if c in COLUMNS and c != "registration_id"]
+            if cols and not changed.empty:
+                assignments = ", ".join(f"{_quote(c)} = ?" for c in cols)
+                rows = changed.astype(object).where(changed.notna(), None)
+                con.executemany(f"UPDATE doctors SET {assignments} WHERE registration_id = ?",
+                                ([_to_sql(v) for v in row[cols]] + [row["registration_id"]]
+                                 for _, row in rows.iterrows()))
+            self._insert(con, new.reindex(columns=COLUMNS))
+            if not changed.empty or not new.empty:
+                self._store_aggregates(con, current.iloc[changed.index], pd.concat([changed, new]))
+        if conflicts:
+            raise ConflictError(conflicts)
+
+    def replace(self, df: pd.DataFrame):
+        self.cache.invalidate()
+        with self._connect() as con:
+            con.execute("DELETE FROM doctors")
+            con.execute("DELETE FROM aggregates")
+            self._insert(con, df.reindex(columns=COLUMNS))
+            self._store_aggregates(con, None, None)
+
+    def append(self, row: dict):
+        self.cache.invalidate()
+        added = pd.DataFrame([row]).reindex(columns=COLUMNS)
+        with self._connect() as con:
+            self._insert(con, added)
+            self._store_aggregates(con, None, added)
+
+    def append_many(self, chunks) -> int:
+        """Insert an iterable of DataFrame chunks in a single transaction."""
+        n = 0
+        self.cache.invalidate()
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            for chunk in chunks:
+                chunk = chunk.reindex(columns=COLUMNS)
+                self._insert(con, chunk)
+                self._store_aggregates(con, None, chunk)
+                n += len(chunk)
+        return n
+
+    def update(self, registration_id: str, values: dict, expected_version=None):
+        values = {k: v for k, v in values.items() if k in COLUMNS and k != "row_version"}
+        self.cache.invalidate()
+        assignments = "".join(f"{_quote(c)} = ?, " for c in values)
+        sql = (f"UPDATE doctors SET {assignments}row_version = COALESCE(row_version, 0) + 1 "
+               "WHERE registration_id = ?")
+        params = [_to_sql(v) for v in values.values()] + [registration_id]
+        if expected_version is not None:
+            sql += " AND COALESCE(row_version, 0) = ?"
+            params.append(int(expected_version))
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            removed = self._select_id(con, registration_id)
+            if removed.empty:
+                raise KeyError(registration_id)
+            if con.execute(sql, params).rowcount == 0:
+                raise ConflictError([registration_id])
+            self._store_aggregates(con, removed, self._select_id(con, registration_id))
+
+    def get(self, registration_id: str):
+        with self._connect() as con:
+            match = self._select_id(con, registration_id)
+        return None if match.empty else match.iloc[0]
+
+    # Aggregates live in the same database and are updated in the same
+    # transaction as the rows they summarise
+    def aggregates(self) -> DashboardAggregates:
+        with self._connect() as con:
+            row = con.execute("SELECT data FROM aggregates WHERE id = 1").fetchone()
+            if row is not None:
+                return DashboardAggregates.from_json(row[0])
+            con.execute("BEGIN IMMEDIATE")
+            return self._store_aggregates(con, None, None)
+
+    def rebuild_aggregates(self):
+        with self._connect() as con:
+            con.execute("BEGIN IMMEDIATE")
+            con.execute("DELETE FROM aggregates")
+            self._store_aggregates(con, None, None)
+
+    def _store_aggregates(self, con, removed, added) -> DashboardAggregates:
+        row = con.execute("SELECT data FROM aggregates WHERE id = 1").fetchone()
+        if row is None:
+            agg = DashboardAggregates.from_roster(self._select_all(con))
+        else:
+            agg = DashboardAggregates.from_json(row[0])
+            agg.apply(removed, added)
+        con.execute("INSERT OR REPLACE INTO aggregates (id, data) VALUES (1, ?)", (agg.to_json(),))
+        return agg
+
+    def _select_all(self, con) -> pd.DataFrame:
+        return pd.read_sql_query("SELECT * FROM doctors ORDER BY rowid", con)
+
+    def _select_id(self, con, registration_id: str) -> pd.DataFrame:
+        return pd.read_sql_query("SELECT * FROM doctors WHERE registration_id = ?",
+                                 con, params=[registration_id])
+
+    def _insert(self, con, df: pd.DataFrame):
+        if df.empty:
+            return
+        names = ", ".join(_quote(c) for c in COLUMNS)
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        con.executemany(f"INSERT INTO doctors ({names}) VALUES ({placeholders})",
+                        ([_to_sql(v) for v in row] for row in rows))
+
+
+def _quote(col: str) -> str:
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _to_sql(val):
+    # sqlite3 cannot bind numpy scalars
+    if isinstance(val, np.generic):
+        return val.item()
+    return val
+
+
+def _read_header(path: str):
+    try:
+        with open(path, newline="") as f:
+            first = f.readline()
+    except FileNotFoundError:
+        return None
+    if not first.strip():
+        return None
+    return next(csv.reader([first]))
+
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        kind = os.environ.get("ROSTER_BACKEND", "csv").lower()
+        if kind == "sqlite":
+            _backend = SqliteBackend(os.environ.get("ROSTER_DB", "roster.db"))
+        elif kind == "csv":
+            _backend = CsvBackend(CSV_FILE)
+        else:
+            raise ValueError(f"Unknown ROSTER_BACKEND: {kind}")
+    return _backend
+
+
+def set_backend(backend):
+    """Use `backend` for the module-level helpers below (tools and benchmarks)."""
+    global _backend
+    _backend = backend
+
+
+# Load doctors
+def load_doctors() -> pd.DataFrame:
+    return get_backend().load()
+
+# Save doctors, writing only the rows that changed. Pass the frame as it
+# was loaded as `base` so rows this session never touched are skipped;
+# edited rows that another session changed first raise ConflictError.
+def save_doctors(df: pd.DataFrame, base: pd.DataFrame = None):
+    get_backend().save(df, base)
+
+def append_doctor(row: dict):
+    get_backend().append(row)
+
+def append_doctors(chunks) -> int:
+    return get_backend().append_many(chunks)
+
+def update_doctor(registration_id: str, values: dict, expected_version=None):
+    get_backend().update(registration_id, values, expected_version)
+
+def get_doctor(registration_id: str):
+    return get_backend().get(registration_id)
+
+def roster_index() -> RosterIndex:
+    return get_backend().index()
+
+def cache_stats() -> dict:
+    return get_backend().cache.stats()
+
+# Pass the roster the caller already loaded as `df` so the result lines up
+# with it row for row, even if another session has since changed the file
+def rotations_table(df: pd.DataFrame = None) -> pd.DataFrame:
+    backend = get_backend()
+    return backend.cache.derived("rotations", build_rotations_table, backend.load() if df is None else df)
+
+def typed_doctors(df: pd.DataFrame = None) -> pd.DataFrame:
+    backend = get_backend()
+    return backend.cache.derived("typed", typed_roster, backend.load() if df is None else df)
+
+def roster_memory_report(df: pd.DataFrame = None) -> dict:
+    """memory_report() for the roster; deep memory_usage is slow on large
+    rosters, so it is measured once per roster version."""
+    backend = get_backend()
+    return backend.cache.derived("memory", lambda d: memory_report(d, typed_doctors(d)),
+                                 backend.load() if df is None else df)
+
+def dashboard_aggregates() -> DashboardAggregates:
+    return get_backend().aggregates()
+
+def rebuild_aggregates():
+    get_backend().rebuild_aggregates()
+
+
+# ---------------------------
+# CSV -> SQLite migration
+# ---------------------------
+
+def migrate_csv_to_sqlite(csv_path: str, db_path: str) -> int:
+    df = pd.read_csv(csv_path, dtype=TEXT_DTYPES)
+    SqliteBackend(db_path).replace(df)
+    return len(df)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Roster storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mig = sub.add_parser("migrate", help="Import a roster CSV into a SQLite database")
+    mig.add_argument("--csv", default=CSV_FILE)
+    mig.add_argument("--db", default="roster.db")
+    sub.add_parser("rebuild-aggregates", help="Recompute dashboard aggregates from the roster")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        n = migrate_csv_to_sqlite(args.csv, args.db)
+        print(f"Imported {n} doctors from {args.csv} into {args.db}")
+    elif args.command == "rebuild-aggregates":
+        rebuild_aggregates()
+        print(f"Rebuilt dashboard aggregates for {len(load_doctors())} doctors")
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from schema import (ENTRUSTMENT_LEVELS, EPA_IDS, EPA_TARGETS, PROCEDURE_DEFAULT_TOTALS, SPONSORING_INSTITUTIONS,
+                    STATUS_COLS)
+from storage import COLUMNS
+
+# ---------------------------
+# Synthetic rosters
+# ---------------------------
+# Generates rosters in the default.csv layout for load testing and the
+# benchmarks in bench.py. Values follow the shape of the real data: later
+# years have more procedures done, higher EPA levels and more passes. The
+# same seed always gives the same roster.
+
+FIRST_NAMES = ["Alice", "Ben", "Chloe", "Daniel", "Emily", "Farhan", "Grace", "Hui Min", "Isaac", "Jia Hui",
+               "Kumar", "Li Wei", "Maya", "Nur", "Oliver", "Priya", "Qi Xuan", "Rachel", "Sanjay", "Tom"]
+LAST_NAMES = ["Tan", "Lim", "Lee", "Ng", "Wong", "Goh", "Chua", "Ong", "Koh", "Teo",
+              "Rahman", "Singh", "Kumar", "Smith", "Brown", "Chen", "Ho", "Yeo", "Sim", "Low"]
+NATIONALITIES = ["Singapore", "Malaysia", "Australia", "UK", "New Zealand"]
+MEDICAL_SCHOOLS = ["National University of Singapore", "Duke-NUS", "NTU LKC", "Melbourne Uni",
+                   "King's College", "Otago", "UM"]
+ROTATIONS = ["Trauma", "Cardiac", "Lung", "Orthopaedics", "Paediatrics", "O&G", "Critical Care", "Cardiology",
+             "Neurology", "General Surgery", "Respiratory", "Elective"]
+
+
+def _pick(rng, values, n, p=None) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=p)]
+
+
+def _rotations(rng, n: int) -> pd.Series:
+    # Every resident rotates through ED plus one to three other, distinct
+    # departments: the first columns of a per-row random ordering
+    out = pd.Series("ED", index=range(n), dtype=object)
+    extra = rng.integers(1, 4, size=n)
+    order = np.argsort(rng.random((n, len(ROTATIONS)), dtype=np.float32), axis=1)[:, :3]
+    names = np.asarray(ROTATIONS, dtype=object)
+    for k in range(3):
+        out = out.where(extra <= k, out + ";" + names[order[:, k]])
+    return out
+
+
+def generate_roster(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    year = rng.integers(1, 6, size=n)
+    progress = np.clip(year / 5 + rng.normal(0, 0.15, size=n), 0.05, 1.0)
+
+    first, last = _pick(rng, FIRST_NAMES, n), _pick(rng, LAST_NAMES, n)
+    ids = pd.Series(np.arange(1, n + 1)).map("SYN{:07d}".format)
+    df = pd.DataFrame({
+        "full_name": first + " " + last,
+        "age": 24 + year + rng.integers(0, 6, size=n),
+        "gender": _pick(rng, ["Female", "Male"], n),
+        "nationality": _pick(rng, NATIONALITIES, n, p=[0.7, 0.1, 0.08, 0.07, 0.05]),
+        "medical_school": _pick(rng, MEDICAL_SCHOOLS, n),
+        "registration_id": ids,
+        "email": (pd.Series(first).str.lower().str.replace(" ", "", regex=False) + "."
+                  + pd.Series(last).str.lower() + "." + ids.str.lower() + "@example.com"),
+        "phone": rng.integers(80000000, 100000000, size=n),
+        "year": year,
+        "rotations": _rotations(rng, n),
+        "teaching_hours": np.clip(rng.normal(30 + 5 * year, 12), 0, None).round(1),
+        "created_at": (pd.Timestamp("2021-01-01", tz="UTC")
+                       + pd.to_timedelta(rng.integers(0, 5 * 365, size=n), unit="D")).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "sponsoring_institution": _pick(rng, SPONSORING_INSTITUTIONS, n),
+    })
+
+    for total_col, total in PROCEDURE_DEFAULT_TOTALS.items():
+        df[total_col.replace("_total", "_done")] = rng.binomial(total, progress)
+        df[total_col] = total
+
+    pass_p = np.clip(progress, 0.1, 0.9)
+    for col in STATUS_COLS:
+        draw = rng.random(n)
+        df[col] = np.where(draw < pass_p, "Pass", np.where(draw < pass_p + 0.1, "Fail", "Pending"))
+
+    top = len(ENTRUSTMENT_LEVELS) - 1
+    for epa in EPA_IDS:
+        codes = np.clip(np.rint(progress * top + rng.normal(0, 1.5, size=n)), 0, top).astype(int)
+        df[epa] = np.asarray(ENTRUSTMENT_LEVELS, dtype=object)[codes]
+        df[f"{epa}_Completed"] = np.where(codes >= ENTRUSTMENT_LEVELS.index(EPA_TARGETS[epa]), "Yes", "No")
+
+    df["row_version"] = 0
+    return df[COLUMNS]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from storage import CsvBackend, SqliteBackend
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic resident roster")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic.csv", help="CSV file to write")
+    parser.add_argument("--db", help="Also load the roster into this SQLite database")
+    args = parser.parse_args()
+
+    roster = generate_roster(args.rows, args.seed)
+    CsvBackend(args.out).replace(roster)
+    print(f"Wrote {len(roster)} residents to {args.out}")
+    if args.db:
+        SqliteBackend(args.db).replace(roster)
+        print(f"Loaded {len(roster)} residents into {args.db}")
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+import storage
+from aggregates import DashboardAggregates
+from synthetic import generate_roster
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "csv":
+        backend = storage.CsvBackend(str(tmp_path / "roster.csv"))
+    else:
+        backend = storage.SqliteBackend(str(tmp_path / "roster.db"))
+    backend.replace(generate_roster(30, seed=1))
+    storage.set_backend(backend)
+    yield backend
+    storage.set_backend(None)
+
+
+def totals(agg: DashboardAggregates) -> dict:
+    return {"total": agg.total, "years": dict(agg.years), "rotations": dict(agg.rotations),
+            "institutions": dict(agg.institutions), "epa_completed": dict(agg.epa_completed),
+            "teaching_sum": round(agg.teaching_sum, 6), "teaching_count": agg.teaching_count}
+
+
+def assert_in_step():
+    assert totals(storage.dashboard_aggregates()) == totals(DashboardAggregates.from_roster(storage.load_doctors()))
+
+
+def new_residents(n, seed):
+    rows = generate_roster(n, seed)
+    rows["registration_id"] = [f"NEW{seed}-{i}" for i in range(n)]
+    return rows
+
+
+def test_after_replace(backend):
+    assert_in_step()
+
+
+def test_after_save(backend):
+    base = storage.load_doctors()
+    edited = base.copy()
+    edited.loc[0, ["year", "rotations", "teaching_hours", "EPA1_Completed"]] = [5, "ED;Cardiac", 99.5, "Yes"]
+    edited.loc[1, "sponsoring_institution"] = "SingHealth"
+    storage.save_doctors(edited, base)
+    assert_in_step()
+    base = storage.load_doctors()
+    storage.save_doctors(pd.concat([base, new_residents(2, 7)], ignore_index=True), base)
+    assert_in_step()
+
+
+def test_after_update(backend):
+    rid = storage.load_doctors()["registration_id"].iloc[3]
+    storage.update_doctor(rid, {"EPA2_Completed": "No", "teaching_hours": 1.5, "year": 1})
+    assert_in_step()
+
+
+def test_after_append(backend):
+    storage.append_doctor(new_residents(1, 3).iloc[0].to_dict())
+    assert_in_step()
+    storage.append_doctor({"registration_id": "SPARSE", "full_name": "Dr Sparse"})
+    assert_in_step()
+
+
+def test_after_append_many(backend):
+    rows = new_residents(10, 4)
+    assert storage.append_doctors([rows.iloc[:4], rows.iloc[4:]]) == 10
+    assert_in_step()
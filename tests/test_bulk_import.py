@@ -0,0 +1,47 @@
+import io
+
+import pandas as pd
+import pytest
+
+import storage
+from bulk_import import import_roster
+
+
+@pytest.fixture
+def backend(request, tmp_path):
+    backend = storage.CsvBackend(str(tmp_path / "roster.csv"))
+    storage.set_backend(backend)
+    yield backend
+    storage.set_backend(None)
+
+
+def upload(rows) -> io.BytesIO:
+    return io.BytesIO(pd.DataFrame(rows).to_csv(index=False).encode())
+
+
+def resident(registration_id, **values):
+    row = {"full_name": f"Dr {registration_id}", "registration_id": registration_id, "age": 30, "year": 2,
+           "sponsoring_institution": "NHG", "email": f"{registration_id}@example.com"}
+    row.update(values)
+    return row
+
+
+def test_import_keeps_text_fields_verbatim(backend):
+    result = import_roster(upload([resident("0042", phone="+6591234567"),
+                                   resident("R2", phone="0812345678")]), "cohort.csv")
+    assert (result.imported, result.rejected) == (2, 0)
+    df = storage.load_doctors()
+    assert df["registration_id"].tolist() == ["0042", "R2"]
+    assert df["phone"].tolist() == ["+6591234567", "0812345678"]
+
+
+def test_import_rejects_blank_and_duplicate_ids(backend):
+    result = import_roster(upload([resident("R1"), resident(""), resident("R1")]), "cohort.csv")
+    assert (result.imported, result.rejected) == (1, 2)
+    rejects = pd.read_csv(io.BytesIO(result.rejects_csv))
+    assert rejects["errors"].tolist() == ["registration_id is required", "registration_id already exists"]
+
+
+def test_import_of_an_empty_file(backend):
+    result = import_roster(io.BytesIO(b""), "empty.csv")
+    assert (result.imported, result.rejected) == (0, 0)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from logbook import Logbook, add_logged, read_events
+
+
+def event(registration_id="A", kind="ultrasound_lung", quantity=1, occurred_at="2024-03-05"):
+    return {"registration_id": registration_id, "kind": kind, "quantity": quantity, "occurred_at": occurred_at,
+            "sponsoring_institution": "SGH"}
+
+
+def test_counts_must_be_whole_numbers(tmp_path):
+    book = Logbook(str(tmp_path))
+    with pytest.raises(ValueError):
+        book.log([event(quantity=0.5)])
+    assert book.log([event(kind="teaching", quantity=1.5)]) == 1
+    assert book.resident_totals("A")["teaching"]["quantity"] == 1.5
+
+
+def test_recover_in_another_process_waits_for_log(tmp_path, monkeypatch):
+    book = Logbook(str(tmp_path))
+    write_file = book._write_file
+    threads = []
+
+    def slow_write(month, part, prefix="part"):
+        path = write_file(month, part, prefix)
+        # A second Logbook (as another process would) starts recover() while
+        # the file exists but is not yet registered
+        thread = threading.Thread(target=Logbook, args=(str(tmp_path),))
+        thread.start()
+        time.sleep(0.2)
+        threads.append(thread)
+        return path
+
+    monkeypatch.setattr(book, "_write_file", slow_write)
+    assert book.log([event()]) == 1
+    threads[0].join()
+    assert book.resident_totals("A")["ultrasound_lung"]["events"] == 1
+
+
+def test_compact_keeps_totals_and_events(tmp_path):
+    book = Logbook(str(tmp_path))
+    book.log([event()])
+    book.log([event(quantity=2), event("B", occurred_at="2024-04-01")])
+    assert book.compact("2024-03") == 2
+    assert len(book.events(["2024-03"])) == 2
+    roster = pd.DataFrame({"registration_id": ["A", "B", "C"], "ultrasound_lung_done": [1, 2, 3]})
+    assert add_logged(roster, book.totals_frame())["ultrasound_lung_done"].tolist() == [4, 3, 3]
+
+
+def test_read_events_keeps_registration_ids_as_text(tmp_path):
+    path = tmp_path / "events.csv"
+    path.write_text("registration_id,kind,occurred_at,quantity,note\n0042,teaching,2024-03-05,2,NA\n")
+    book = Logbook(str(tmp_path / "logbook"))
+    book.log(read_events(str(path)))
+    assert book.resident_totals("0042")["teaching"]["quantity"] == 2
+    assert book.events()["note"].tolist() == ["NA"]
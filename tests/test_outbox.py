@@ -0,0 +1,27 @@
+from outbox import Outbox
+
+
+def message(registration_id, recipient, name="Dr X"):
+    return {"registration_id": registration_id, "full_name": name, "sender": "admin@example.com",
+            "recipient": recipient, "subject": "Reminder", "body": "Hello"}
+
+
+def test_enqueue_reports_invalid_and_duplicate_rows(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    first = outbox.enqueue([message("A", "a@example.com"), message("B", "b@example.com")], "c1")
+    assert (first.queued, first.duplicates, first.invalid) == (2, 0, [])
+
+    again = outbox.enqueue([message("A", "a@example.com"), message(float("nan"), "x@example.com", "No ID"),
+                            message("C", "", "No email"), message("D", None, "No email")], "c1")
+    assert (again.queued, again.duplicates) == (0, 1)
+    assert [m["full_name"] for m in again.invalid] == ["No ID", "No email", "No email"]
+    assert outbox.status_counts("c1")["pending"] == 2
+
+
+def test_claim_only_returns_configured_senders(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    other = dict(message("B", "b@example.com"), sender="other@example.com")
+    outbox.enqueue([message("A", "a@example.com"), other], "c1")
+    assert outbox.claim([]) == []
+    assert [m["registration_id"] for m in outbox.claim(["other@example.com"])] == ["B"]
+    assert outbox.status_counts("c1") == {"pending": 1, "sending": 1, "sent": 0, "failed": 0}
@@ -0,0 +1,21 @@
+import os
+
+from reports import _filenames, generate_reports
+from synthetic import generate_roster
+
+
+def test_colliding_ids_get_distinct_files():
+    assert _filenames(["A/1", "A_1", "a_1", "index", "A_1-2"]) == [
+        "A_1.html", "A_1-2.html", "a_1-3.html", "index-2.html", "A_1-2-2.html"]
+
+
+def test_index_escapes_every_cell(tmp_path):
+    roster = generate_roster(2)
+    roster.loc[0, "sponsoring_institution"] = "<script>alert(1)</script>"
+    roster.loc[0, "registration_id"] = "A/1"
+    roster.loc[1, "registration_id"] = "A_1"
+    assert generate_reports(roster, str(tmp_path), workers=1) == 2
+    index = (tmp_path / "index.html").read_text()
+    assert "<script>" not in index and "&lt;script&gt;" in index
+    assert "href='A_1.html'" in index and "href='A_1-2.html'" in index
+    assert {"A_1.html", "A_1-2.html"} <= set(os.listdir(tmp_path))
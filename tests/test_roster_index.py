@@ -0,0 +1,18 @@
+import pandas as pd
+
+from roster_index import RosterIndex
+
+
+def test_duplicate_ids_resolve_to_the_first_row():
+    df = pd.DataFrame({"registration_id": ["REG001", "REG002", "REG001"], "full_name": ["Alice", "Bob", "Zed"]})
+    index = RosterIndex(df)
+    assert len(index) == 2
+    assert index.label("REG001") == "Alice"
+    assert index.row(df, "REG001")["full_name"] == "Alice"
+
+
+def test_shared_names_are_labelled_with_their_id():
+    df = pd.DataFrame({"registration_id": ["A", "B"], "full_name": ["Sam Tan", "Sam Tan"]})
+    index = RosterIndex(df)
+    assert index.ids_for_name("Sam Tan") == ["A", "B"]
+    assert index.label("B") == "Sam Tan (B)"
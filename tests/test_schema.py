@@ -0,0 +1,25 @@
+import pandas as pd
+
+from schema import level_codes, typed_roster
+
+
+def test_typed_roster_uses_compact_dtypes_for_clean_data():
+    typed = typed_roster(pd.DataFrame({"age": [28, 30], "year": ["1", "5"], "adult_med_done": [3, None]}))
+    assert str(typed["age"].dtype) == "UInt8"
+    assert str(typed["year"].dtype) == "UInt8"
+    assert str(typed["adult_med_done"].dtype) == "UInt16"
+    assert typed["adult_med_done"].isna().tolist() == [False, True]
+
+
+def test_typed_roster_keeps_bad_cells_instead_of_raising():
+    typed = typed_roster(pd.DataFrame({"age": [28, 300], "year": [1, -1],
+                                       "adult_med_done": [2.5, 4], "adult_med_total": ["45", "lots"]}))
+    assert typed["age"].tolist() == [28, 300]
+    assert typed["year"].tolist() == [1, -1]
+    assert typed["adult_med_done"].tolist() == [2.5, 4]
+    assert str(typed["adult_med_total"].dtype) == "UInt16"
+    assert typed["adult_med_total"].isna().tolist() == [False, True]
+
+
+def test_level_codes_accepts_mixed_level_spellings():
+    assert level_codes(pd.Series([3, "3", "3.0", "3a", None, "bogus"])).tolist() == [4, 4, 4, 5, -1, -1]
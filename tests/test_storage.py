@@ -0,0 +1,148 @@
+import pandas as pd
+import pytest
+
+from storage import COLUMNS, ConflictError, CsvBackend, SqliteBackend, _edited, _merge
+
+
+def roster(*rows):
+    """Minimal roster rows: (registration_id, teaching_hours, row_version)."""
+    return pd.DataFrame([{"registration_id": rid, "full_name": f"Dr {rid}", "teaching_hours": hours,
+                          "row_version": version} for rid, hours, version in rows])
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "csv":
+        backend = CsvBackend(str(tmp_path / "roster.csv"))
+    else:
+        backend = SqliteBackend(str(tmp_path / "roster.db"))
+    backend.replace(roster(("A", 10, 0), ("B", 20, 0), ("C", 30, 0)).reindex(columns=COLUMNS))
+    return backend
+
+
+# ---------------------------
+# _edited / _merge
+# ---------------------------
+
+def test_edited_keeps_only_changed_and_new_rows():
+    base = roster(("A", 10, 0), ("B", 20, 0))
+    df = roster(("A", 10, 0), ("B", 25, 0), ("C", 30, 0))
+    assert _edited(base, df)["registration_id"].tolist() == ["B", "C"]
+
+
+def test_edited_treats_text_and_numbers_alike():
+    base = roster(("A", 10, 0))
+    df = roster(("A", "10", 0))
+    assert _edited(base, df).empty
+
+
+def test_merge_bumps_version_of_changed_rows():
+    current = roster(("A", 10, 0), ("B", 20, 3))
+    changed, new, conflicts = _merge(current, roster(("B", 25, 3)))
+    assert changed.index.tolist() == [1]
+    assert changed["row_version"].tolist() == [4]
+    assert new.empty and conflicts == []
+
+
+def test_merge_reports_stale_edits_as_conflicts():
+    current = roster(("A", 10, 1))
+    changed, new, conflicts = _merge(current, roster(("A", 15, 0)))
+    assert changed.empty and new.empty
+    assert conflicts == ["A"]
+
+
+def test_merge_ignores_stale_rows_that_were_not_edited():
+    current = roster(("A", 10, 1))
+    changed, new, conflicts = _merge(current, roster(("A", 10, 0)))
+    assert changed.empty and new.empty and conflicts == []
+
+
+def test_merge_splits_out_new_rows():
+    changed, new, conflicts = _merge(roster(("A", 10, 0)), roster(("Z", 5, 0)))
+    assert changed.empty and conflicts == []
+    assert new["registration_id"].tolist() == ["Z"]
+
+
+def test_merge_into_empty_roster():
+    changed, new, conflicts = _merge(roster().reindex(columns=["registration_id"]), roster(("A", 1, 0)))
+    assert changed.empty and len(new) == 1 and conflicts == []
+
+
+# ---------------------------
+# Backends
+# ---------------------------
+
+def hours(backend, rid):
+    return float(backend.get(rid)["teaching_hours"])
+
+
+def test_save_from_two_sessions_editing_different_rows(backend):
+    first, second = backend.load(), backend.load()
+    edit_a = first.copy()
+    edit_a.loc[edit_a["registration_id"] == "A", "teaching_hours"] = 11
+    edit_b = second.copy()
+    edit_b.loc[edit_b["registration_id"] == "B", "teaching_hours"] = 21
+    backend.save(edit_a, first)
+    backend.save(edit_b, second)
+    assert hours(backend, "A") == 11 and hours(backend, "B") == 21 and hours(backend, "C") == 30
+
+
+def test_save_of_stale_edit_raises_and_keeps_first_write(backend):
+    first, second = backend.load(), backend.load()
+    edit_1 = first.copy()
+    edit_1.loc[edit_1["registration_id"] == "A", "teaching_hours"] = 11
+    backend.save(edit_1, first)
+    edit_2 = second.copy()
+    edit_2.loc[edit_2["registration_id"] == "A", "teaching_hours"] = 99
+    with pytest.raises(ConflictError) as exc:
+        backend.save(edit_2, second)
+    assert exc.value.registration_ids == ["A"]
+    assert hours(backend, "A") == 11
+
+
+def test_update_with_expected_version(backend):
+    backend.update("A", {"EPA1": "3a"}, expected_version=0)
+    assert int(backend.get("A")["row_version"]) == 1
+    with pytest.raises(ConflictError):
+        backend.update("A", {"EPA1": "4b"}, expected_version=0)
+    assert str(backend.get("A")["EPA1"]) == "3a"
+    backend.update("A", {"EPA1": "4b"}, expected_version=1)
+    assert str(backend.get("A")["EPA1"]) == "4b"
+
+
+def test_update_unknown_resident(backend):
+    with pytest.raises(KeyError):
+        backend.update("nope", {"EPA1": "3"})
+
+
+def test_typed_doctors_follows_the_frame_passed_in(backend, monkeypatch):
+    import storage
+
+    monkeypatch.setattr(storage, "_backend", backend)
+    df = storage.load_doctors()
+    assert storage.typed_doctors(df) is storage.typed_doctors(storage.load_doctors())
+    # Another session adds a resident after this one loaded its roster
+    other = type(backend)(backend.path)
+    other.append(dict(roster(("D", 40, 0)).iloc[0]))
+    assert len(storage.typed_doctors(df)) == len(df) == 3
+    assert len(storage.typed_doctors()) == 4
+
+
+def test_memory_report_is_measured_once_per_roster_version(backend, monkeypatch):
+    import storage
+
+    monkeypatch.setattr(storage, "_backend", backend)
+    report = storage.roster_memory_report(storage.load_doctors())
+    assert report["rows"] == 3
+    assert storage.roster_memory_report(storage.load_doctors()) is report
+    backend.append(dict(roster(("D", 40, 0)).iloc[0]))
+    assert storage.roster_memory_report()["rows"] == 4
+
+
+def test_get_and_index_read_the_cached_roster(backend):
+    backend.load()
+    assert backend.index() is backend.index()
+    row = backend.get("B")
+    row["teaching_hours"] = 99
+    assert hours(backend, "B") == 20
+    assert backend.get("nope") is None